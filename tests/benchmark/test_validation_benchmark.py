@@ -0,0 +1,221 @@
+import json
+import os
+import pandas.core.arraylike
+import pytest
+import sys
+import tracemalloc
+from xdmod_data.warehouse import DataWarehouse
+
+# Each benchmark counts the operations and measures the peak memory of
+# validating a query at a small and at a large size of the warehouse, where
+# the large size is SCALE times the small one. If either grows by more than
+# SCALE * SLACK times, the benchmark fails, which catches quadratic behavior
+# (SCALE ** 2 times) while tolerating constant overhead. The operations are
+# the Python and built-in function calls plus the elements compared by
+# pandas comparisons, e.g., `df['label'] == value`, so that a lookup that
+# scans a whole data frame counts as many operations. Unlike wall-clock
+# times, the counts are the same on every run and every machine.
+SCALE = 8
+SLACK = 2
+XDMOD_HOST = 'https://xdmod.example.org'
+COMPARISONS = ('__eq__', '__ne__', '__lt__', '__le__', '__gt__', '__ge__')
+
+
+@pytest.fixture(scope='module', autouse=True)
+def set_environ():
+    token = (
+        os.environ['XDMOD_API_TOKEN']
+        if 'XDMOD_API_TOKEN' in os.environ
+        else ''
+    )
+    os.environ['XDMOD_API_TOKEN'] = 'benchmark'
+    yield
+    os.environ['XDMOD_API_TOKEN'] = token
+
+
+class ValidationDone(Exception):
+    pass
+
+
+def get_synthetic_server(
+    fake_response,
+    num_dimensions=10,
+    num_filter_values=10,
+    num_fields=10,
+):
+    # Return a function that serves the descriptors and filter values of a
+    # synthetic warehouse with one realm, and raises ValidationDone for any
+    # request that is only made after a query has been validated.
+    aggregate_descriptor = json.dumps({
+        'totalCount': 1,
+        'data': [{'realms': {'Jobs': {
+            'category': 'Jobs',
+            'metrics': {
+                'total_cpu_hours': {
+                    'text': 'CPU Hours: Total',
+                    'info': 'The total CPU hours.',
+                },
+            },
+            'dimensions': {
+                'none': {'text': 'None', 'info': 'No dimension.'},
+                **{
+                    'dimension_' + str(i): {
+                        'text': 'Dimension ' + str(i),
+                        'info': 'Synthetic dimension ' + str(i) + '.',
+                    }
+                    for i in range(num_dimensions)
+                },
+            },
+        }}}],
+    })
+    filter_values = [
+        {'id': str(i), 'name': 'Value ' + str(i)}
+        for i in range(num_filter_values)
+    ]
+    raw_descriptor = json.dumps({'data': [{
+        'id': 'Jobs',
+        'name': 'Jobs',
+        'fields': [
+            {
+                'alias': 'field_' + str(i),
+                'display': 'Field ' + str(i),
+                'documentation': 'Synthetic field ' + str(i) + '.',
+            }
+            for i in range(num_fields)
+        ],
+    }]})
+
+    def respond(request):
+        data = request['data'] or {}
+        if data.get('operation') == 'get_dw_descripter':
+            return fake_response(text=aggregate_descriptor)
+        elif data.get('operation') == 'get_dimension':
+            return fake_response(text=json.dumps({'data': filter_values[
+                data['start']:data['start'] + data['limit']
+            ]}))
+        elif request['url'].startswith(
+            XDMOD_HOST + '/rest/v1/warehouse/export/realms',
+        ):
+            return fake_response(text=raw_descriptor)
+        raise ValidationDone
+
+    return respond
+
+
+def validate_dimension(size, fakes):
+    (fake_transport, fake_response) = fakes
+    with DataWarehouse(
+        XDMOD_HOST,
+        check_connection=False,
+        transport=fake_transport(
+            get_synthetic_server(fake_response, num_dimensions=size),
+        ),
+    ) as dw:
+        dw.prepare(dimension='Dimension ' + str(size - 1))
+
+
+def validate_filters(size, fakes):
+    # The filter lists contain a tenth of the values of the dimension.
+    (fake_transport, fake_response) = fakes
+    with DataWarehouse(
+        XDMOD_HOST,
+        check_connection=False,
+        transport=fake_transport(
+            get_synthetic_server(fake_response, num_filter_values=size),
+        ),
+    ) as dw:
+        dw.prepare(filters={
+            'Dimension 0': [
+                'Value ' + str(i) for i in range(size - 1, 0, -10)
+            ],
+        })
+
+
+def validate_raw_fields(size, fakes):
+    (fake_transport, fake_response) = fakes
+    with DataWarehouse(
+        XDMOD_HOST,
+        check_connection=False,
+        transport=fake_transport(
+            get_synthetic_server(fake_response, num_fields=size),
+        ),
+    ) as dw:
+        with pytest.raises(ValidationDone):
+            dw.get_raw_data(
+                duration=('2024-01-01', '2024-01-31'),
+                realm='Jobs',
+                fields=['Field ' + str(i) for i in range(size - 1, -1, -1)],
+            )
+
+
+def count_comparisons(monkeypatch, counter):
+    # Count the elements compared by each comparison of a pandas Series or
+    # Index.
+    def wrap(method):
+        def wrapper(self, other):
+            counter[0] += len(self)
+            return method(self, other)
+        return wrapper
+    for name in COMPARISONS:
+        monkeypatch.setattr(
+            pandas.core.arraylike.OpsMixin,
+            name,
+            wrap(getattr(pandas.core.arraylike.OpsMixin, name)),
+        )
+
+
+def measure(function, size, fakes, counter):
+    # Return the number of operations and the peak memory of one run.
+    def count_call(frame, event, arg):
+        if event in ('call', 'c_call'):
+            counter[0] += 1
+    counter[0] = 0
+    sys.setprofile(count_call)
+    try:
+        function(size, fakes)
+    finally:
+        sys.setprofile(None)
+    num_operations = counter[0]
+    tracemalloc.start()
+    try:
+        function(size, fakes)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return (num_operations, peak_memory)
+
+
+@pytest.mark.parametrize(
+    'function, size',
+    [
+        (validate_dimension, 500),
+        (validate_filters, 10000),
+        (validate_raw_fields, 500),
+    ],
+    ids=('dimension', 'filters', 'raw_fields'),
+)
+def test_validation_scales_linearly(
+    monkeypatch,
+    fake_transport,
+    fake_response,
+    function,
+    size,
+):
+    fakes = (fake_transport, fake_response)
+    counter = [0]
+    count_comparisons(monkeypatch, counter)
+    (small_operations, small_memory) = measure(function, size, fakes, counter)
+    (large_operations, large_memory) = measure(
+        function,
+        size * SCALE,
+        fakes,
+        counter,
+    )
+    message = (
+        function.__name__ + ': ' + str(size) + ' -> ' + str(size * SCALE)
+        + ': ' + str(small_operations) + ' -> ' + str(large_operations)
+        + ' operations, ' + str(small_memory) + ' B -> ' + str(large_memory)
+        + ' B'
+    )
+    assert large_operations / small_operations < SCALE * SLACK, message
+    assert large_memory / small_memory < SCALE * SLACK, message
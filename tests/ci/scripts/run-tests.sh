@@ -18,7 +18,8 @@ declare -a python_containers=$(yq '.services | keys | .[] | select(. == "python-
 declare -a xdmod_containers=$(yq '.services | keys | .[] | select(. == "xdmod-*")' $BASE_DIR/docker-compose.yml)
 
 # Copy the xdmod-data source code to the Python containers, lint
-# with Flake 8, and install the package and its testing
+# with Flake 8, and install the package (with its optional extras, so
+# the Arrow, Polars, and HTTP/2 code paths are tested) and its testing
 # dependencies.
 for python_container in $python_containers; do
   docker cp $PROJECT_DIR/. $python_container:/home/circleci/project
@@ -26,7 +27,7 @@ for python_container in $python_containers; do
   docker exec -w /home/circleci/project $python_container bash -c 'python3 -m pip install --upgrade pip'
   docker exec -w /home/circleci/project $python_container bash -c 'python3 -m pip install --upgrade flake8 flake8-commas flake8-quotes'
   docker exec -w /home/circleci/project $python_container bash -c 'python3 -m flake8 . --max-complexity=10 --show-source --exclude __init__.py'
-  docker exec -w /home/circleci/project $python_container bash -c 'python3 -m pip install -e .'
+  docker exec -w /home/circleci/project $python_container bash -c 'python3 -m pip install -e .[arrow,http2,polars]'
   docker exec -w /home/circleci/project $python_container bash -c 'python3 -m pip install --upgrade python-dotenv pytest coverage'
   # The minimum version of each dependency should be tested in the
   # container with the minimum Python version.
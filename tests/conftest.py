@@ -0,0 +1,56 @@
+import pytest
+import threading
+from xdmod_data.transport import Transport
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, text='', chunks=()):
+        self.status_code = status_code
+        self.text = text
+        self.__chunks = chunks
+
+    def iter_content(self, chunk_size):
+        return iter(self.__chunks)
+
+    def close(self):
+        pass
+
+
+class FakeTransport(Transport):
+    # Records each request, as a dict of the arguments of `request()`, and
+    # returns the response that `respond` returns for it.
+    def __init__(self, respond):
+        self.requests = []
+        self.__respond = respond
+        self.__lock = threading.Lock()
+
+    def request(
+        self,
+        method,
+        url,
+        headers,
+        data=None,
+        stream=False,
+        timeout=None,
+    ):
+        request = {
+            'method': method,
+            'url': url,
+            'headers': headers,
+            'data': data,
+            'stream': stream,
+            'timeout': timeout,
+        }
+        with self.__lock:
+            self.requests.append(request)
+        return self.__respond(request)
+
+
+@pytest.fixture
+def fake_transport():
+    return FakeTransport
+
+
+@pytest.fixture
+def fake_response():
+    return FakeResponse
@@ -1,8 +1,13 @@
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+import json
 import os
 import pandas
 from pathlib import Path
 import pytest
+import time
+from xdmod_data._cli import main
+from xdmod_data.transport import RequestsTransport
 from xdmod_data.warehouse import DataWarehouse
 
 VALID_XDMOD_HOST = os.environ['XDMOD_HOST']
@@ -457,3 +462,461 @@ def test_case_insensitive(dw_methods, method, param, value1, value2):
 )
 def test_trailing_slashes(dw_methods, method):
     __run_method(dw_methods, method)
+
+
+@pytest.mark.parametrize(
+    'dimension, dataset_type, return_type, columns_nlevels',
+    [
+        ('None', 'timeseries', pandas.core.frame.DataFrame, 1),
+        ('Resource', 'timeseries', pandas.core.frame.DataFrame, 2),
+        ('None', 'aggregate', pandas.core.series.Series, None),
+        ('Resource', 'aggregate', pandas.core.frame.DataFrame, 1),
+    ],
+    ids=(
+        'no_dimension,timeseries',
+        'dimension,timeseries',
+        'no_dimension,aggregate',
+        'dimension,aggregate',
+    ),
+)
+def test_get_data_multiple_metrics(
+    dw_methods,
+    dimension,
+    dataset_type,
+    return_type,
+    columns_nlevels,
+):
+    metrics = ['CPU Hours: Total', 'Number of Users: Active']
+    params = {
+        **get_data_return_value_test_params,
+        'dimension': dimension,
+        'dataset_type': dataset_type,
+    }
+    data = __run_method(dw_methods, 'get_data', {**params, 'metric': metrics})
+    assert isinstance(data, return_type)
+    if columns_nlevels is None:
+        assert data.index.to_list() == metrics
+        return
+    assert data.columns.nlevels == columns_nlevels
+    assert data.columns.get_level_values('Metric').unique().to_list() == (
+        metrics
+    )
+    for metric in metrics:
+        expected = __run_method(
+            dw_methods,
+            'get_data',
+            {**params, 'metric': metric},
+        )
+        actual = data[metric]
+        if dataset_type == 'timeseries':
+            actual = actual.dropna(how='all')
+            if dimension == 'None':
+                actual = actual.to_frame()
+                actual.columns.name = 'Metric'
+        assert actual.equals(expected)
+
+
+def test_get_data_ValueError_empty_metric(dw_methods):
+    __test_exception(
+        dw_methods,
+        'get_data',
+        {'metric': []},
+        ValueError,
+        'metric',
+    )
+
+
+@pytest.mark.parametrize(
+    'aggregation_unit',
+    ['Day', 'Month'],
+)
+def test_get_data_cache_timeseries(dw_methods, aggregation_unit):
+    params = {
+        **get_data_return_value_test_params,
+        'dimension': 'Resource',
+        'aggregation_unit': aggregation_unit,
+    }
+    with DataWarehouse(VALID_XDMOD_HOST, cache_timeseries=True) as dw:
+        dw.get_data(**{**params, 'duration': ('2016-12-01', '2016-12-31')})
+        actual = dw.get_data(**params)
+    expected = __run_method(dw_methods, 'get_data', params)
+    assert actual.equals(expected[actual.columns])
+
+
+def test_cache_path(dw_methods, tmp_path):
+    cache_path = tmp_path / 'xdmod-data-cache.sqlite'
+    params = {**get_data_return_value_test_params, 'dimension': 'Resource'}
+    results = []
+    for _ in range(2):
+        with DataWarehouse(VALID_XDMOD_HOST, cache_path=cache_path) as dw:
+            results.append((
+                dw.get_data(**params),
+                dw.get_filter_values('Jobs', 'Resource'),
+            ))
+    assert results[0][0].equals(results[1][0])
+    assert results[0][1].equals(results[1][1])
+    assert results[0][0].equals(__run_method(dw_methods, 'get_data', params))
+
+
+def test_get_raw_data_num_processes(dw_methods):
+    params = {'duration': ('2016-12-25', '2016-12-31'), 'realm': 'Jobs'}
+    expected = dw_methods['get_raw_data'](**params)
+    actual = dw_methods['get_raw_data'](**params, num_processes=2)
+    assert actual.equals(expected)
+
+
+def test_get_raw_data_ValueError_num_processes(dw_methods):
+    __test_exception(
+        dw_methods,
+        'get_raw_data',
+        {'num_processes': 0},
+        ValueError,
+        '`num_processes` must be positive.',
+    )
+
+
+@pytest.mark.parametrize('string_storage', ['pyarrow', 'python'])
+def test_get_raw_data_memory_limit(dw_methods, string_storage):
+    pytest.importorskip('pyarrow')
+    params = {'duration': ('2016-12-25', '2016-12-31'), 'realm': 'Jobs'}
+    with pandas.option_context('mode.string_storage', string_storage):
+        expected = dw_methods['get_raw_data'](**params)
+        if string_storage == 'pyarrow':
+            actual = dw_methods['get_raw_data'](**params, memory_limit=100000)
+        else:
+            with pytest.warns(UserWarning, match='read back into memory'):
+                actual = dw_methods['get_raw_data'](
+                    **params,
+                    memory_limit=100000,
+                )
+    assert actual.shape == expected.shape
+    assert actual.equals(expected)
+
+
+def test_get_raw_data_checkpoint_dir(dw_methods, tmp_path):
+    params = {'duration': ('2016-12-25', '2017-01-05'), 'realm': 'Jobs'}
+    expected = dw_methods['get_raw_data'](**params)
+    actual = dw_methods['get_raw_data'](**params, checkpoint_dir=tmp_path)
+    assert actual.sort_values(list(actual.columns)).reset_index(
+        drop=True,
+    ).equals(
+        expected.sort_values(list(expected.columns)).reset_index(drop=True),
+    )
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_concurrent_identical_requests(fake_transport):
+    # The requests reach the server through a transport that counts them,
+    # and the filter values are served slowly so that all the threads ask
+    # for them while the first request is in flight.
+    requests_transport = RequestsTransport()
+
+    def respond(request):
+        response = requests_transport.request(
+            request['method'],
+            request['url'],
+            request['headers'],
+            data=request['data'],
+            stream=request['stream'],
+            timeout=request['timeout'],
+        )
+        if __is_filter_values_request(request):
+            time.sleep(1)
+        return response
+
+    transport = fake_transport(respond)
+    with DataWarehouse(VALID_XDMOD_HOST, transport=transport) as dw:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(
+                lambda _: dw.get_filter_values('Jobs', 'Resource'),
+                range(8),
+            ))
+    for result in results[1:]:
+        assert result.equals(results[0])
+    assert sum(
+        1 for request in transport.requests
+        if __is_filter_values_request(request)
+    ) == 1
+
+
+def __is_filter_values_request(request):
+    return (request['data'] or {}).get('operation') == 'get_dimension'
+
+
+def test_concurrent_different_requests(dw_methods):
+    durations = [
+        ('2016-12-22', '2016-12-' + str(day)) for day in range(23, 32)
+    ]
+    expected = [
+        __run_method(dw_methods, 'get_data', {'duration': duration})
+        for duration in durations
+    ]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        actual = list(executor.map(
+            lambda duration: __run_method(
+                dw_methods,
+                'get_data',
+                {'duration': duration},
+            ),
+            durations,
+        ))
+    for (actual_data, expected_data) in zip(actual, expected):
+        assert actual_data.equals(expected_data)
+
+
+def test_prepared_query(dw_methods):
+    params = default_valid_params['get_data']
+    durations = [
+        ('2016-12-22', '2016-12-' + str(day)) for day in range(23, 27)
+    ]
+    expected = [
+        __run_method(dw_methods, 'get_data', {'duration': duration})
+        for duration in durations
+    ]
+    with DataWarehouse(VALID_XDMOD_HOST) as dw:
+        query = dw.prepare(
+            realm=params['realm'],
+            metric=params['metric'],
+            dimension=params['dimension'],
+            filters=params['filters'],
+        )
+        execute_params = {
+            'dataset_type': params['dataset_type'],
+            'aggregation_unit': params['aggregation_unit'],
+        }
+        assert query.execute(
+            duration=durations[0],
+            **execute_params,
+        ).equals(expected[0])
+        actual = query.execute_many(durations, **execute_params)
+    for (actual_data, expected_data) in zip(actual, expected):
+        assert actual_data.equals(expected_data)
+
+
+def test_prepared_query_TypeError_durations():
+    with DataWarehouse(VALID_XDMOD_HOST) as dw:
+        query = dw.prepare()
+        with pytest.raises(
+            TypeError,
+            match='`durations` must be a sequence of durations.',
+        ):
+            query.execute_many('Previous month')
+
+
+def test_aggregate_raw_data(tmp_path):
+    pytest.importorskip('pyarrow')
+    duration = ('2016-12-25', '2016-12-31')
+    with DataWarehouse(
+        VALID_XDMOD_HOST,
+        raw_data_store_dir=tmp_path,
+    ) as dw:
+        raw_data = dw.get_raw_data(duration=duration, realm='Jobs')
+    actual = dw.aggregate_raw_data(
+        duration=duration,
+        realm='Jobs',
+        fields='Nodes',
+        dimensions='Resource',
+        dataset_type='aggregate',
+    )
+    end_times = pandas.to_datetime(
+        pandas.to_numeric(raw_data['End Time (Timestamp)']),
+        unit='s',
+    )
+    raw_data = raw_data[
+        (end_times >= pandas.Timestamp(duration[0]))
+        & (end_times < pandas.Timestamp(duration[1]) + pandas.Timedelta('1D'))
+    ]
+    expected = pandas.to_numeric(raw_data['Nodes']).groupby(
+        raw_data['Resource'].astype(object),
+    ).sum()
+    assert actual['Nodes'].to_dict() == expected.astype(float).to_dict()
+
+
+@pytest.mark.parametrize('dataset_type', ['timeseries', 'aggregate'])
+def test_get_data_top_n(dw_methods, dataset_type):
+    params = {
+        **get_data_return_value_test_params,
+        'metric': 'CPU Hours: Total',
+        'dimension': 'Resource',
+        'dataset_type': dataset_type,
+    }
+    expected = __run_method(dw_methods, 'get_data', params)
+    actual = __run_method(
+        dw_methods,
+        'get_data',
+        {**params, 'top_n': 2, 'include_other': True},
+    )
+    top = list(actual.index if dataset_type == 'aggregate' else actual.columns)
+    assert top[-1] == 'Other'
+    assert len(top) == 3
+    assert actual[top[:2]].equals(expected[top[:2]])
+    assert actual.sum(axis=None) == pytest.approx(expected.sum(axis=None))
+
+
+def test_get_data_ValueError_top_n(dw_methods):
+    __test_exception(
+        dw_methods,
+        'get_data',
+        {'dimension': 'None', 'top_n': 2},
+        ValueError,
+        'can only be used with a `dimension`',
+    )
+
+
+@pytest.mark.parametrize('dimension', ['None', 'Resource'])
+def test_get_data_output_format(dw_methods, dimension):
+    params = {**get_data_return_value_test_params, 'dimension': dimension}
+    dense = __run_method(dw_methods, 'get_data', params)
+    sparse = __run_method(
+        dw_methods,
+        'get_data',
+        {**params, 'output_format': 'sparse'},
+    )
+    long = __run_method(
+        dw_methods,
+        'get_data',
+        {**params, 'output_format': 'long'},
+    )
+    assert sparse.sparse.to_dense().astype('Float64').equals(dense)
+    assert len(long) == dense.notna().sum().sum()
+    assert long[params['metric']].sum() == pytest.approx(dense.sum().sum())
+
+
+def test_cli(tmp_path, capsys):
+    job_file = tmp_path / 'jobs.json'
+    job_file.write_text(json.dumps({
+        'xdmod_host': VALID_XDMOD_HOST,
+        'jobs': [
+            {
+                'name': 'data',
+                'method': 'get_data',
+                'params': get_data_return_value_test_params,
+                'output': str(tmp_path / 'data.csv'),
+            },
+            {
+                'name': 'raw-data',
+                'method': 'get_raw_data',
+                'params': {
+                    'duration': ['2016-12-25', '2016-12-31'],
+                    'realm': 'Jobs',
+                },
+                'output': str(tmp_path / 'raw-data.ndjson'),
+            },
+            {
+                'name': 'invalid',
+                'method': 'get_data',
+                'params': {'metric': INVALID_STR},
+                'output': str(tmp_path / 'invalid.csv'),
+            },
+        ],
+    }))
+    assert main([str(job_file), '--job', 'data', '--job', 'raw-data']) == 0
+    assert (tmp_path / 'data.csv').exists()
+    assert (tmp_path / 'raw-data.ndjson').exists()
+    assert main([str(job_file)]) == 1
+    assert not (tmp_path / 'invalid.csv').exists()
+    assert 'invalid: FAILED' in capsys.readouterr().err
+
+
+@pytest.mark.parametrize('dataset_type', ['timeseries', 'aggregate'])
+def test_get_data_max_filter_values(dw_methods, dataset_type):
+    with DataWarehouse(VALID_XDMOD_HOST) as dw:
+        resources = list(dw.get_filter_values('Jobs', 'Resource').index)
+    # The order of the filter values must not affect the order of the result.
+    params = {
+        **get_data_return_value_test_params,
+        'dimension': 'Resource',
+        'filters': {'Resource': resources[::-1]},
+        'dataset_type': dataset_type,
+    }
+    expected = __run_method(dw_methods, 'get_data', params)
+    with DataWarehouse(VALID_XDMOD_HOST, max_filter_values=1) as dw:
+        actual = dw.get_data(**params)
+    assert actual.equals(expected)
+
+
+def test_get_raw_data_max_filter_values(dw_methods):
+    params = {
+        'duration': ('2016-12-25', '2016-12-31'),
+        'realm': 'Jobs',
+        'filters': {'Resource': ['mortorq', 'robertson']},
+    }
+    expected = __run_method(dw_methods, 'get_raw_data', params)
+    with DataWarehouse(VALID_XDMOD_HOST, max_filter_values=1) as dw:
+        actual = dw.get_raw_data(**params)
+    columns = list(expected.columns)
+    assert actual.sort_values(columns).reset_index(drop=True).equals(
+        expected.sort_values(columns).reset_index(drop=True),
+    )
+
+
+@pytest.mark.parametrize('method', ['get_data', 'get_raw_data'])
+def test_backend(dw_methods, method):
+    pytest.importorskip('pyarrow')
+    pytest.importorskip('polars')
+    expected = __run_method(dw_methods, method)
+    arrow = __run_method(dw_methods, method, {'backend': 'arrow'})
+    polars = __run_method(dw_methods, method, {'backend': 'polars'})
+    if method == 'get_raw_data':
+        assert arrow.column_names == list(expected.columns)
+    assert arrow.num_rows == len(expected)
+    assert polars.shape == (arrow.num_rows, arrow.num_columns)
+    __test_exception(
+        dw_methods,
+        method,
+        {'backend': INVALID_STR},
+        KeyError,
+        'Invalid value for `backend`',
+    )
+
+
+@pytest.mark.parametrize('aggregation_unit', ['Month', 'Quarter', 'Year'])
+@pytest.mark.parametrize('metric', ['CPU Hours: Total', 'CPU Hours: Per Job'])
+def test_get_data_resample_timeseries(dw_methods, aggregation_unit, metric):
+    params = {
+        **get_data_return_value_test_params,
+        'metric': metric,
+        'dimension': 'Resource',
+        'aggregation_unit': aggregation_unit,
+    }
+    expected = __run_method(dw_methods, 'get_data', params)
+    with DataWarehouse(
+        VALID_XDMOD_HOST,
+        cache_timeseries=True,
+        resample_timeseries=True,
+    ) as dw:
+        actual = dw.get_data(**params)
+    pandas.testing.assert_frame_equal(
+        actual,
+        expected,
+        check_exact=False,
+        check_like=True,
+    )
+
+
+@pytest.mark.parametrize('method', ['get_data', 'get_raw_data'])
+def test_deadline(dw_methods, method):
+    expected = __run_method(dw_methods, method)
+    actual = __run_method(dw_methods, method, {'deadline': 600})
+    assert actual.equals(expected)
+    __test_exception(
+        dw_methods,
+        method,
+        {'deadline': 1e-9},
+        TimeoutError,
+        'The `deadline` of 1e-09 s was exceeded.',
+    )
+    __test_exception(
+        dw_methods,
+        method,
+        {'deadline': 0},
+        ValueError,
+        '`deadline` must be positive.',
+    )
+
+
+def test_hedge_requests(dw_methods):
+    expected = __run_method(dw_methods, 'get_data')
+    with DataWarehouse(VALID_XDMOD_HOST, hedge_requests=True) as dw:
+        actual = dw.get_data(**default_valid_params['get_data'])
+    assert actual.equals(expected)
@@ -0,0 +1,114 @@
+import pytest
+import json
+import os
+import pandas
+import xdmod_data._cli as _cli
+from xdmod_data._cli import main
+
+XDMOD_HOST = 'https://xdmod.example.org'
+VALID_JOB = {
+    'name': 'data',
+    'method': 'get_data',
+    'output': 'data.csv',
+}
+
+
+@pytest.mark.parametrize(
+    'job_file, match',
+    [
+        ('[]', 'must be an object with a list of `jobs`'),
+        ('{"jobs": {}}', 'must be an object with a list of `jobs`'),
+        ({'jobs': []}, '`xdmod_host` is missing'),
+        (
+            {'xdmod_host': XDMOD_HOST, 'jobs': [{'name': 'data'}]},
+            'every job must have a `method`',
+        ),
+        (
+            {'xdmod_host': XDMOD_HOST, 'jobs': [VALID_JOB, VALID_JOB]},
+            "job name 'data' is not unique",
+        ),
+        (
+            {
+                'xdmod_host': XDMOD_HOST,
+                'jobs': [{**VALID_JOB, 'method': 'describe_realms'}],
+            },
+            "job 'data' has an invalid `method`",
+        ),
+        (
+            {'xdmod_host': XDMOD_HOST, 'jobs': [{**VALID_JOB, 'format': 'x'}]},
+            "job 'data' has an invalid `format`",
+        ),
+        (
+            {
+                'xdmod_host': XDMOD_HOST,
+                'jobs': [{**VALID_JOB, 'output': 'data.txt'}],
+            },
+            'cannot be determined',
+        ),
+        (
+            {'xdmod_host': XDMOD_HOST, 'jobs': [{**VALID_JOB, 'params': []}]},
+            "`params` of job 'data' must be an object",
+        ),
+        ('{', 'invalid job file'),
+    ],
+    ids=(
+        'not_object',
+        'jobs_not_list',
+        'xdmod_host_missing',
+        'key_missing',
+        'name_not_unique',
+        'invalid_method',
+        'invalid_format',
+        'unknown_extension',
+        'params_not_object',
+        'invalid_json',
+    ),
+)
+def test_main_invalid_job_file(tmp_path, capsys, job_file, match):
+    path = tmp_path / 'jobs.json'
+    path.write_text(
+        job_file if isinstance(job_file, str) else json.dumps(job_file),
+    )
+    assert main([str(path)]) == 2
+    err = capsys.readouterr().err
+    assert 'xdmod-data: invalid job file: ' in err
+    assert match in err
+
+
+def test_main_missing_job_file(tmp_path, capsys):
+    assert main([str(tmp_path / 'jobs.json')]) == 2
+    assert 'xdmod-data: invalid job file: ' in capsys.readouterr().err
+
+
+def test_main_unknown_job(tmp_path, capsys):
+    path = tmp_path / 'jobs.json'
+    path.write_text(json.dumps({
+        'xdmod_host': XDMOD_HOST,
+        'jobs': [VALID_JOB],
+    }))
+    assert main([str(path), '--job', 'data', '--job', 'other']) == 2
+    assert 'xdmod-data: unknown jobs: other' in capsys.readouterr().err
+
+
+def test_main_max_workers(tmp_path):
+    with pytest.raises(SystemExit):
+        main([str(tmp_path / 'jobs.json'), '--max-workers', '0'])
+
+
+def test_write(tmp_path):
+    write = getattr(_cli, '__write')
+    path = tmp_path / 'data.csv'
+    write(pandas.DataFrame({'a': [1, 2]}), str(path), 'csv', 0o022)
+    assert os.listdir(tmp_path) == ['data.csv']
+    assert os.stat(path).st_mode & 0o777 == 0o644
+    assert path.read_text() == 'a\n1\n2\n'
+
+
+def test_write_error(tmp_path):
+    write = getattr(_cli, '__write')
+    path = tmp_path / 'data.ndjson'
+    # Records cannot have duplicate columns.
+    data = pandas.DataFrame([[1, 2]], columns=['a', 'a'])
+    with pytest.raises(ValueError):
+        write(data, str(path), 'ndjson', 0o022)
+    assert os.listdir(tmp_path) == []
@@ -1,6 +1,10 @@
+from concurrent.futures import ThreadPoolExecutor
+import json
 import pytest
 import os
 import requests
+import threading
+from xdmod_data.transport import RecordingTransport, ReplayTransport, Transport
 from xdmod_data.warehouse import DataWarehouse
 
 
@@ -25,6 +29,118 @@ def test___init___TypeError_xdmod_host():
         DataWarehouse(2)
 
 
+@pytest.mark.parametrize(
+    'param',
+    [
+        'cache_timeseries',
+        'check_connection',
+        'warm_up',
+        'resample_timeseries',
+        'hedge_requests',
+    ],
+)
+def test___init___TypeError_bool(param):
+    with pytest.raises(
+        TypeError,
+        match='`' + param + '` must be a Boolean.',
+    ):
+        DataWarehouse(VALID_XDMOD_HOST, **{param: 'yes'})
+
+
+@pytest.mark.parametrize(
+    'params, error, match',
+    [
+        ({'cache_path': 2}, TypeError, '`cache_path` must be a string'),
+        (
+            {'cache_path': INVALID_STR, 'cache_size_limit': 1.5},
+            TypeError,
+            '`cache_size_limit` must be an integer.',
+        ),
+        (
+            {'cache_path': INVALID_STR, 'cache_max_age': 0},
+            ValueError,
+            '`cache_max_age` must be positive.',
+        ),
+        (
+            {'raw_data_store_dir': 2},
+            TypeError,
+            '`raw_data_store_dir` must be a string',
+        ),
+    ],
+    ids=(
+        'cache_path',
+        'cache_size_limit',
+        'cache_max_age',
+        'raw_data_store_dir',
+    ),
+)
+def test___init___cache_params(params, error, match):
+    with pytest.raises(error, match=match):
+        DataWarehouse(VALID_XDMOD_HOST, **params)
+
+
+@pytest.mark.parametrize(
+    'transport, error, match',
+    [
+        (2, TypeError, '`transport` must be a string or a `Transport`.'),
+        (INVALID_STR, KeyError, 'Invalid value for `transport`'),
+    ],
+    ids=('TypeError', 'KeyError'),
+)
+def test___init___transport(transport, error, match):
+    with pytest.raises(error, match=match):
+        DataWarehouse(VALID_XDMOD_HOST, transport=transport)
+
+
+@pytest.mark.parametrize(
+    'max_filter_values, error, match',
+    [
+        (1.5, TypeError, '`max_filter_values` must be an integer.'),
+        (0, ValueError, '`max_filter_values` must be positive.'),
+    ],
+    ids=('TypeError', 'ValueError'),
+)
+def test___init___max_filter_values(max_filter_values, error, match):
+    with pytest.raises(error, match=match):
+        DataWarehouse(VALID_XDMOD_HOST, max_filter_values=max_filter_values)
+
+
+@pytest.mark.parametrize(
+    'timeout, error, match',
+    [
+        ('10', TypeError, '`timeout` must be a number.'),
+        ((10, None), TypeError, '`timeout` must be a number.'),
+        (0, ValueError, '`timeout` must be positive.'),
+        ((10, 300, 5), ValueError, '`timeout` must be a number or a tuple'),
+    ],
+    ids=('TypeError', 'TypeError_tuple', 'ValueError', 'ValueError_tuple'),
+)
+def test___init___timeout(timeout, error, match):
+    with pytest.raises(error, match=match):
+        DataWarehouse(VALID_XDMOD_HOST, timeout=timeout)
+
+
+def test___init___timeout_list(fake_transport, fake_response):
+    # E.g., the `options` of a job file of the `xdmod-data` command are JSON,
+    # which has lists but not tuples.
+    transport = fake_transport(lambda request: fake_response())
+    with DataWarehouse(
+        VALID_XDMOD_HOST,
+        transport=transport,
+        timeout=[10, 300],
+    ):
+        pass
+    assert transport.requests[0]['timeout'] == (10, 300)
+
+
+def test___init___ValueError_resample_timeseries():
+    with pytest.raises(
+        ValueError,
+        match='`resample_timeseries` can only be used with `cache_timeseries`',
+    ):
+        DataWarehouse(VALID_XDMOD_HOST, resample_timeseries=True)
+
+
 def test___init___KeyError():
     token = os.environ['XDMOD_API_TOKEN']
     del os.environ['XDMOD_API_TOKEN']
@@ -70,6 +186,284 @@ def test___enter___RuntimeError_xdmod_host_unsupported_protocol():
             pass
 
 
+def test___enter___check_connection_false():
+    invalid_host = 'https://' + INVALID_STR + '.xdmod.org'
+    with DataWarehouse(invalid_host, check_connection=False) as dw:
+        with pytest.raises(Exception):
+            dw.describe_realms()
+
+
+def test___exit___warm_up():
+    threads = set(threading.enumerate())
+    with DataWarehouse(VALID_XDMOD_HOST, warm_up=True):
+        pass
+    assert set(threading.enumerate()) <= threads
+
+
+def test___enter___custom_transport(fake_transport, fake_response):
+    # Transports written before `timeout` was added are still supported.
+    class OldTransport(Transport):
+        def __init__(self):
+            self.requests = []
+
+        def request(self, method, url, headers, data=None, stream=False):
+            self.requests.append((method, url))
+            return fake_response()
+
+    transport = fake_transport(lambda request: fake_response())
+    with DataWarehouse(VALID_XDMOD_HOST, transport=transport, timeout=5):
+        pass
+    assert [
+        (request['method'], request['url'], request['timeout'])
+        for request in transport.requests
+    ] == [('HEAD', VALID_XDMOD_HOST.rstrip('/'), (5, 5))]
+    transport = OldTransport()
+    with DataWarehouse(VALID_XDMOD_HOST, transport=transport):
+        pass
+    assert transport.requests == [('HEAD', VALID_XDMOD_HOST.rstrip('/'))]
+
+
+def test___enter___circuit_breaker(fake_transport, fake_response):
+    transport = fake_transport(lambda request: fake_response(
+        200 if request['method'] == 'HEAD' else 503,
+        '{"message": "Service Unavailable"}',
+    ))
+    with DataWarehouse(VALID_XDMOD_HOST, transport=transport) as dw:
+        for _ in range(5):
+            with pytest.raises(RuntimeError, match='Error 503'):
+                dw.describe_realms()
+        with pytest.raises(RuntimeError, match='suspended after 5'):
+            dw.describe_realms()
+    assert len(transport.requests) == 6
+
+
+def __serve_split_raw_data(fake_response, resources, respond_to_raw_data):
+    # Return a function that serves a Jobs realm with a Resource dimension
+    # whose values are `resources` and a single raw data field, and the
+    # response of `respond_to_raw_data` to each request for raw data. The
+    # server has no limit on the number of raw data rows, i.e., it streams
+    # them.
+    def respond(request):
+        data = request['data'] or {}
+        path = request['url'].partition('?')[0][len(VALID_XDMOD_HOST):]
+        if data.get('operation') == 'get_dw_descripter':
+            return fake_response(text=json.dumps({
+                'totalCount': 1,
+                'data': [{'realms': {'Jobs': {
+                    'category': 'Jobs',
+                    'metrics': {},
+                    'dimensions': {
+                        'resource': {'text': 'Resource', 'info': ''},
+                    },
+                }}}],
+            }))
+        elif data.get('operation') == 'get_dimension':
+            return fake_response(text=json.dumps({'data': [
+                {'id': str(i), 'name': resource}
+                for (i, resource) in enumerate(resources)
+            ][data['start']:data['start'] + data['limit']]}))
+        elif path.endswith('/rest/v1/warehouse/export/realms'):
+            return fake_response(text=json.dumps({'data': [{
+                'id': 'Jobs',
+                'name': 'Jobs',
+                'fields': [{
+                    'alias': 'nodes',
+                    'display': 'Nodes',
+                    'documentation': '',
+                }],
+            }]}))
+        elif path.endswith('/rest/v1/warehouse/raw-data/limit'):
+            return fake_response(404, '{"message": "Not Found"}')
+        return respond_to_raw_data(request)
+
+    return respond
+
+
+def test_get_raw_data_split_filters_concurrently(
+    fake_transport,
+    fake_response,
+):
+    # Each part of a split filter streams more chunks than are prefetched,
+    # and the limit of the governor has been halved, so parts that are
+    # prefetched must not keep the part being read from getting a slot.
+    resources = ['Resource ' + str(i) for i in range(8)]
+    failures = [True]
+
+    def respond_to_raw_data(request):
+        if failures:
+            failures.pop()
+            return fake_response(503, '{"message": "Service Unavailable"}')
+        return fake_response(chunks=[b'\x1e["Nodes"]\n'] + [
+            b'\x1e["1"]\n' for _ in range(50)
+        ])
+
+    params = {
+        'duration': ('2024-01-01', '2024-01-31'),
+        'realm': 'Jobs',
+        'filters': {'Resource': resources},
+        'deadline': 10,
+    }
+    with DataWarehouse(
+        VALID_XDMOD_HOST,
+        check_connection=False,
+        transport=fake_transport(__serve_split_raw_data(
+            fake_response,
+            resources,
+            respond_to_raw_data,
+        )),
+        max_filter_values=1,
+    ) as dw:
+        with pytest.raises(RuntimeError, match='Error 503'):
+            dw.get_raw_data(**params)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = list(executor.map(
+                lambda _: dw.get_raw_data(**params),
+                range(2),
+            ))
+    for result in results:
+        assert len(result) == 8 * 50
+
+
+def test_get_raw_data_split_filters_checkpoint(
+    tmp_path,
+    fake_transport,
+    fake_response,
+):
+    # The second part fails after the first part has been read, so the
+    # checkpoint of the first part must be kept for the rerun.
+    resources = ['Resource 0', 'Resource 1']
+    failures = [True]
+
+    def respond_to_raw_data(request):
+        if '%5Bresource%5D=1&' in request['url'] and failures:
+            failures.pop()
+            return fake_response(500, '{"message": "Internal Error"}')
+        return fake_response(chunks=[b'\x1e["Nodes"]\n', b'\x1e["1"]\n'])
+
+    transport = fake_transport(__serve_split_raw_data(
+        fake_response,
+        resources,
+        respond_to_raw_data,
+    ))
+    params = {
+        'duration': ('2024-01-01', '2024-01-31'),
+        'realm': 'Jobs',
+        'filters': {'Resource': resources},
+        'checkpoint_dir': tmp_path,
+    }
+    with DataWarehouse(
+        VALID_XDMOD_HOST,
+        check_connection=False,
+        transport=transport,
+        max_filter_values=1,
+    ) as dw:
+        with pytest.raises(RuntimeError, match='Error 500'):
+            dw.get_raw_data(**params)
+        num_requests = len(transport.requests)
+        assert len(dw.get_raw_data(**params)) == 2
+    # Only the second part is requested again.
+    assert [
+        request['url'].partition('?')[2]
+        for request in transport.requests[num_requests:]
+        if '/raw-data?' in request['url']
+    ] == [
+        'realm=Jobs&start_date=2024-01-01&end_date=2024-01-31'
+        + '&filters%5Bresource%5D=1&Bearer=' + INVALID_STR,
+    ]
+    assert os.listdir(tmp_path) == []
+
+
+@pytest.mark.parametrize(
+    'chunks, num_columns',
+    [([b'\x1e["Nodes"]\n'], 1), ([], 0)],
+    ids=('header', 'empty'),
+)
+@pytest.mark.parametrize('checkpoint', [True, False])
+def test_get_raw_data_empty_duration(
+    tmp_path,
+    fake_transport,
+    fake_response,
+    chunks,
+    num_columns,
+    checkpoint,
+):
+    # A duration that ends before it starts has no shards, but the request
+    # is still made, and a response without even a header gives an empty
+    # result without columns.
+    transport = fake_transport(__serve_split_raw_data(
+        fake_response,
+        [],
+        lambda request: fake_response(chunks=chunks),
+    ))
+    with DataWarehouse(
+        VALID_XDMOD_HOST,
+        check_connection=False,
+        transport=transport,
+    ) as dw:
+        result = dw.get_raw_data(
+            duration=('2024-02-01', '2024-01-31'),
+            realm='Jobs',
+            checkpoint_dir=tmp_path if checkpoint else None,
+        )
+    assert result.shape == (0, num_columns)
+    assert len([
+        request for request in transport.requests
+        if '/raw-data?' in request['url']
+    ]) == 1
+
+
+def test___enter___record_and_replay(tmp_path):
+    cassette_path = tmp_path / 'cassette.sqlite'
+    with DataWarehouse(
+        VALID_XDMOD_HOST,
+        transport=RecordingTransport(cassette_path),
+    ):
+        pass
+    with open(cassette_path, 'rb') as cassette_file:
+        assert os.environ['XDMOD_API_TOKEN'].encode() not in (
+            cassette_file.read()
+        )
+    transport = ReplayTransport(cassette_path)
+    with DataWarehouse(VALID_XDMOD_HOST, transport=transport):
+        pass
+    with pytest.raises(KeyError, match='not found in the cassette'):
+        transport.request('GET', VALID_XDMOD_HOST + '/' + INVALID_STR, {})
+
+
+def test___enter___cache_path_unusable(tmp_path):
+    cache_path = tmp_path / 'cache.sqlite'
+    dw = DataWarehouse(VALID_XDMOD_HOST, cache_path=cache_path)
+    assert not cache_path.exists()
+    # A directory cannot be opened as a database.
+    cache_path.mkdir(mode=0o700)
+    with pytest.warns(UserWarning, match='will not be cached'):
+        with dw:
+            pass
+
+
+def test___enter___cache_path_accessible_by_others(tmp_path):
+    cache_path = tmp_path / 'cache.sqlite'
+    cache_path.touch(mode=0o644)
+    cache_path.chmod(0o644)
+    with pytest.warns(
+        UserWarning,
+        match='can be accessed by users other than its owner',
+    ):
+        with DataWarehouse(VALID_XDMOD_HOST, cache_path=cache_path):
+            pass
+    assert cache_path.stat().st_size == 0
+
+
+def test___enter___cache_path_of_another_user(tmp_path, monkeypatch):
+    cache_path = tmp_path / 'cache.sqlite'
+    cache_path.touch(mode=0o600)
+    monkeypatch.setattr(os, 'getuid', lambda: cache_path.stat().st_uid + 1)
+    with pytest.warns(UserWarning, match='belongs to another user'):
+        with DataWarehouse(VALID_XDMOD_HOST, cache_path=cache_path):
+            pass
+    assert cache_path.stat().st_size == 0
+
+
 def test___enter___RuntimeError_401():
     with pytest.raises(
         RuntimeError,
@@ -83,3 +477,12 @@ def test___enter___RuntimeError_401():
 def test_exit_without_enter():
     dw = DataWarehouse(VALID_XDMOD_HOST)
     dw.__exit__(None, None, None)
+
+
+def test_aggregate_raw_data_RuntimeError():
+    dw = DataWarehouse(VALID_XDMOD_HOST)
+    with pytest.raises(
+        RuntimeError,
+        match='`raw_data_store_dir` must be given',
+    ):
+        dw.aggregate_raw_data('Yesterday', 'Jobs', 'Nodes')
@@ -0,0 +1,83 @@
+import pytest
+import time
+from xdmod_data._governor import _Governor
+
+XDMOD_HOST = 'https://xdmod.example.org'
+KEY = 'key'
+
+
+def open_circuit(governor):
+    for _ in range(5):
+        start_time = governor._acquire()
+        governor._record(start_time, KEY, 503)
+        governor._release()
+    with pytest.raises(RuntimeError, match='suspended after 5'):
+        governor._acquire()
+
+
+def test_probe_after_cooldown():
+    governor = _Governor(XDMOD_HOST, 8, cooldown=0.1)
+    open_circuit(governor)
+    time.sleep(0.1)
+    # Only a single request checks whether the server has recovered.
+    start_time = governor._acquire()
+    with pytest.raises(RuntimeError, match='suspended after 5'):
+        governor._acquire()
+    governor._record(start_time, KEY, 503)
+    governor._release()
+    with pytest.raises(RuntimeError, match='suspended after 5'):
+        governor._acquire()
+    time.sleep(0.1)
+    start_time = governor._acquire()
+    governor._record(start_time, KEY, 200)
+    governor._release()
+    governor._acquire()
+    governor._release()
+
+
+def test_abandoned_probe():
+    governor = _Governor(XDMOD_HOST, 8, cooldown=0.1)
+    open_circuit(governor)
+    time.sleep(0.1)
+    start_time = governor._acquire()
+    governor._abandon(start_time)
+    governor._release()
+    start_time = governor._acquire()
+    governor._record(start_time, KEY, 200)
+    governor._release()
+
+
+def acquire_all(governor):
+    # Return the start times of as many requests as can be in flight.
+    start_times = []
+    while True:
+        start_time = governor._acquire(timeout=0.01)
+        if start_time is None:
+            return start_times
+        start_times.append(start_time)
+
+
+def release_all(governor, start_times, key, latency):
+    for start_time in start_times:
+        governor._record(start_time - latency, key, 200)
+        governor._release()
+
+
+def test_slow_request():
+    governor = _Governor(XDMOD_HOST, 8, min_latency_threshold=0.5)
+    release_all(governor, acquire_all(governor), KEY, 0.2)
+    # A request that takes longer than it usually does halves the limit.
+    start_times = acquire_all(governor)
+    assert len(start_times) == 8
+    release_all(governor, start_times[:1], KEY, 1)
+    for _ in start_times[1:]:
+        governor._release()
+    assert len(acquire_all(governor)) == 4
+
+
+def test_slow_different_request():
+    governor = _Governor(XDMOD_HOST, 8, min_latency_threshold=0.5)
+    release_all(governor, acquire_all(governor), KEY, 0.2)
+    # A different request is not compared with the others.
+    release_all(governor, acquire_all(governor), 'other key', 1)
+    assert len(acquire_all(governor)) == 8
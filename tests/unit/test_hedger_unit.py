@@ -0,0 +1,109 @@
+import pytest
+import threading
+import time
+from xdmod_data._hedger import _Hedger
+
+KEY = 'key'
+MIN_NUM_LATENCIES = 3
+
+
+def get_primed_hedger(latency=0):
+    # Return a hedger that has observed enough latencies of KEY to hedge.
+    hedger = _Hedger(min_num_latencies=MIN_NUM_LATENCIES)
+    for _ in range(MIN_NUM_LATENCIES):
+        hedger._run(KEY, lambda: time.sleep(latency))
+    return hedger
+
+
+def get_counted_function(respond):
+    # Return a function that calls `respond` with the number of the call,
+    # starting at 0, together with the list of the numbers of its calls.
+    calls = []
+    lock = threading.Lock()
+
+    def function():
+        with lock:
+            call_num = len(calls)
+            calls.append(call_num)
+        return respond(call_num)
+
+    return (function, calls)
+
+
+def test_not_hedged_before_min_num_latencies():
+    hedger = _Hedger(min_num_latencies=MIN_NUM_LATENCIES)
+    (function, calls) = get_counted_function(lambda call_num: call_num)
+    for call_num in range(MIN_NUM_LATENCIES):
+        assert hedger._run(KEY, function) == call_num
+    assert calls == list(range(MIN_NUM_LATENCIES))
+
+
+def test_slow_request_hedged():
+    hedger = get_primed_hedger()
+    release = threading.Event()
+
+    def respond(call_num):
+        # The original request only returns once the test is done.
+        if call_num == 0:
+            release.wait()
+            return 'slow'
+        return 'fast'
+
+    (function, calls) = get_counted_function(respond)
+    try:
+        assert hedger._run(KEY, function) == 'fast'
+    finally:
+        release.set()
+    assert calls == [0, 1]
+
+
+def test_fast_request_not_hedged():
+    hedger = get_primed_hedger(latency=0.5)
+    (function, calls) = get_counted_function(lambda call_num: 'result')
+    assert hedger._run(KEY, function) == 'result'
+    assert calls == [0]
+
+
+def test_other_key_not_hedged():
+    hedger = get_primed_hedger()
+    (function, calls) = get_counted_function(lambda call_num: 'result')
+    assert hedger._run('other', function) == 'result'
+    assert calls == [0]
+
+
+def test_slow_request_error():
+    # The original request fails once the duplicate has been sent, so the
+    # response to the duplicate is used.
+    hedger = get_primed_hedger()
+    duplicate_sent = threading.Event()
+
+    def respond(call_num):
+        if call_num == 0:
+            duplicate_sent.wait()
+            raise RuntimeError('slow')
+        duplicate_sent.set()
+        time.sleep(0.1)
+        return 'fast'
+
+    (function, calls) = get_counted_function(respond)
+    assert hedger._run(KEY, function) == 'fast'
+    assert calls == [0, 1]
+
+
+def test_both_requests_error():
+    # The error of the request that fails first is raised.
+    hedger = get_primed_hedger()
+    duplicate_sent = threading.Event()
+
+    def respond(call_num):
+        if call_num == 0:
+            duplicate_sent.wait()
+            raise RuntimeError('original')
+        duplicate_sent.set()
+        time.sleep(0.1)
+        raise RuntimeError('duplicate')
+
+    (function, calls) = get_counted_function(respond)
+    with pytest.raises(RuntimeError, match='original'):
+        hedger._run(KEY, function)
+    assert calls == [0, 1]
@@ -0,0 +1,40 @@
+from concurrent.futures import ProcessPoolExecutor
+import json
+import multiprocessing
+import pandas
+import pytest
+from xdmod_data._raw_data_store import _RawDataStore
+
+NUM_PROCESSES = 4
+NUM_DOWNLOADS = 10
+
+
+def add_downloads(directory, process_num):
+    # Add downloads of different realms, so that none replaces another.
+    store = _RawDataStore(directory)
+    for download_num in range(NUM_DOWNLOADS):
+        store._add(
+            {
+                'realm': 'Realm ' + str(process_num) + '-' + str(download_num),
+                'start_date': '2024-01-01',
+                'end_date': '2024-01-31',
+            },
+            pandas.DataFrame({'Nodes': ['1', '2']}),
+        )
+
+
+def test_add_from_multiple_processes(tmp_path):
+    pytest.importorskip('pyarrow')
+    with ProcessPoolExecutor(
+        max_workers=NUM_PROCESSES,
+        mp_context=multiprocessing.get_context('spawn'),
+    ) as executor:
+        list(executor.map(
+            add_downloads,
+            [str(tmp_path)] * NUM_PROCESSES,
+            range(NUM_PROCESSES),
+        ))
+    with open(tmp_path / 'manifest.json') as manifest_file:
+        manifest = json.load(manifest_file)
+    assert len(manifest['downloads']) == NUM_PROCESSES * NUM_DOWNLOADS
+    assert not [path for path in tmp_path.iterdir() if path.suffix == '.tmp']
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas
+import pytest
+from xdmod_data.themes import plot_timeseries
+
+
+@pytest.fixture(scope='module')
+def data():
+    return pandas.DataFrame(
+        data=np.arange(5000 * 20, dtype=float).reshape(5000, 20),
+        index=pandas.date_range(
+            '2010-01-01',
+            periods=5000,
+            freq='D',
+            name='Time',
+        ),
+        columns=pandas.Index(
+            ['User ' + str(i) for i in range(20)],
+            name='User',
+        ),
+    )
+
+
+def test_plot_timeseries_small(data):
+    figure = plot_timeseries(data.iloc[:10, :2])
+    assert [trace.type for trace in figure.data] == ['scatter', 'scatter']
+    assert [len(trace.x) for trace in figure.data] == [10, 10]
+    assert figure.layout.legend.title.text == 'User'
+
+
+@pytest.mark.parametrize('downsample', ['lttb', 'minmax'])
+def test_plot_timeseries_large(data, downsample):
+    figure = plot_timeseries(
+        data,
+        max_columns=5,
+        max_points=100,
+        downsample=downsample,
+        webgl_threshold=100,
+    )
+    assert [trace.name for trace in figure.data] == [
+        'User 19',
+        'User 18',
+        'User 17',
+        'User 16',
+        'Other',
+    ]
+    for trace in figure.data:
+        assert trace.type == 'scattergl'
+        assert len(trace.x) <= 100
+        assert trace.x[0] == data.index[0]
+        assert trace.x[-1] == data.index[-1]
+
+
+def test_plot_timeseries_KeyError_downsample(data):
+    with pytest.raises(KeyError, match='Invalid value for `downsample`'):
+        plot_timeseries(data, downsample='average')
@@ -0,0 +1,56 @@
+import pytest
+import os
+from xdmod_data.transport import Http2Transport, Transport
+from xdmod_data.warehouse import DataWarehouse
+
+
+VALID_XDMOD_HOST = os.environ['XDMOD_HOST']
+INVALID_STR = 'asdlkfjsdlkfisdjkfjd'
+
+
+@pytest.fixture(scope='module', autouse=True)
+def set_environ():
+    token = (
+        os.environ['XDMOD_API_TOKEN']
+        if 'XDMOD_API_TOKEN' in os.environ
+        else ''
+    )
+    os.environ['XDMOD_API_TOKEN'] = INVALID_STR
+    yield
+    os.environ['XDMOD_API_TOKEN'] = token
+
+
+def test_Transport_TypeError_abstract():
+    with pytest.raises(TypeError, match='abstract'):
+        Transport()
+
+
+def test_Http2Transport():
+    pytest.importorskip('httpx')
+    pytest.importorskip('h2')
+    with DataWarehouse(
+        VALID_XDMOD_HOST,
+        transport='http2',
+        timeout=10,
+    ) as dw:
+        with pytest.raises(RuntimeError, match='Error 401'):
+            dw.describe_realms()
+
+
+def test_Http2Transport_stream():
+    pytest.importorskip('httpx')
+    pytest.importorskip('h2')
+    transport = Http2Transport()
+    try:
+        response = transport.request(
+            'GET',
+            VALID_XDMOD_HOST,
+            {},
+            stream=True,
+            timeout=(10, 10),
+        )
+        assert isinstance(response.status_code, int)
+        assert isinstance(b''.join(response.iter_content(1024)), bytes)
+        response.close()
+    finally:
+        transport.close()
@@ -0,0 +1,88 @@
+import json
+import os
+import sqlite3
+import threading
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import zlib
+
+
+class _Cassette:
+    # Recorded responses are stored compressed in an SQLite database in the
+    # order in which they were received. Requests are identified by their
+    # method, URL, and form fields without the API token, so a cassette never
+    # contains the token and can be replayed with any token.
+    def __init__(self, path, mode):
+        self.__path = os.fspath(path)
+        self.__lock = threading.Lock()
+        if mode == 'w':
+            if os.path.exists(self.__path):
+                os.remove(self.__path)
+            self.__connection = sqlite3.connect(
+                self.__path,
+                check_same_thread=False,
+            )
+            with self.__connection:
+                self.__connection.execute(
+                    'CREATE TABLE responses ('
+                    + 'id INTEGER PRIMARY KEY, key TEXT NOT NULL,'
+                    + ' status_code INTEGER NOT NULL, body BLOB NOT NULL,'
+                    + ' latency REAL NOT NULL, duration REAL NOT NULL)',
+                )
+        else:
+            if not os.path.exists(self.__path):
+                raise FileNotFoundError(
+                    "Cassette '" + self.__path + "' not found.",
+                )
+            self.__connection = sqlite3.connect(
+                self.__path,
+                check_same_thread=False,
+            )
+
+    def _append(self, key, status_code, body, latency, duration):
+        with self.__lock, self.__connection:
+            self.__connection.execute(
+                'INSERT INTO responses'
+                + ' (key, status_code, body, latency, duration)'
+                + ' VALUES (?, ?, ?, ?, ?)',
+                (key, status_code, zlib.compress(body), latency, duration),
+            )
+
+    def _load(self):
+        # Return the recorded responses to each request, in order; their
+        # bodies are decompressed when they are replayed.
+        records = {}
+        with self.__lock:
+            rows = self.__connection.execute(
+                'SELECT key, status_code, body, latency, duration'
+                + ' FROM responses ORDER BY id',
+            ).fetchall()
+        for (key, status_code, body, latency, duration) in rows:
+            records.setdefault(key, []).append({
+                'status_code': status_code,
+                'body': body,
+                'latency': latency,
+                'duration': duration,
+            })
+        return records
+
+
+def _get_key(method, url, data):
+    (scheme, netloc, path, query, fragment) = urlsplit(url)
+    query = urlencode([
+        (name, value)
+        for (name, value) in parse_qsl(query, keep_blank_values=True)
+        if name != 'Bearer'
+    ])
+    return json.dumps(
+        [
+            method,
+            urlunsplit((scheme, netloc, path, query, fragment)),
+            None if data is None else {
+                name: value
+                for (name, value) in data.items()
+                if name != 'Bearer'
+            },
+        ],
+        sort_keys=True,
+        default=str,
+    )
@@ -0,0 +1,58 @@
+import hashlib
+import json
+import os
+import shutil
+import xdmod_data._files as _files
+
+
+class _Checkpoint:
+    # Completed units of a raw data request (pages or time shards) are saved
+    # in a directory specific to the query, together with a manifest listing
+    # the completed units, so that a rerun of the same query can skip them.
+    # Units are saved as JSON, in which the values of the decoded raw data
+    # were received, so that loading them cannot run arbitrary code.
+    def __init__(self, checkpoint_dir, query):
+        serialized_query = json.dumps(query, sort_keys=True, default=str)
+        self.__directory = os.path.join(
+            os.fspath(checkpoint_dir),
+            hashlib.sha256(serialized_query.encode('utf-8')).hexdigest(),
+        )
+        self.__manifest_path = os.path.join(self.__directory, 'manifest.json')
+        os.makedirs(self.__directory, exist_ok=True)
+        try:
+            with open(self.__manifest_path) as manifest_file:
+                self.__manifest = json.load(manifest_file)
+        except FileNotFoundError:
+            self.__manifest = {
+                'query': json.loads(serialized_query),
+                'fields': None,
+                'units': [],
+            }
+
+    def _get_fields(self):
+        return self.__manifest['fields']
+
+    def _is_completed(self, unit):
+        return unit in self.__manifest['units']
+
+    def _load(self, unit):
+        with open(self.__get_unit_path(unit)) as unit_file:
+            return json.load(unit_file)
+
+    def _save(self, unit, fields, columns):
+        self.__write(self.__get_unit_path(unit), columns)
+        self.__manifest['fields'] = fields
+        self.__manifest['units'].append(unit)
+        self.__write(self.__manifest_path, self.__manifest)
+
+    def _remove(self):
+        shutil.rmtree(self.__directory, ignore_errors=True)
+
+    def __get_unit_path(self, unit):
+        return os.path.join(self.__directory, unit + '.json')
+
+    def __write(self, path, value):
+        def write(temporary_path):
+            with open(temporary_path, 'w') as temporary_file:
+                json.dump(value, temporary_file)
+        _files._write_atomically(path, write)
@@ -0,0 +1,234 @@
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import sys
+import time
+import xdmod_data._files as _files
+import xdmod_data._response_processor as _response_processor
+from xdmod_data.warehouse import DataWarehouse
+
+_METHODS = ('get_data', 'get_raw_data')
+_FORMATS = {
+    '.csv': 'csv',
+    '.parquet': 'parquet',
+    '.ndjson': 'ndjson',
+    '.jsonl': 'ndjson',
+}
+
+
+def main(argv=None):
+    args = __parse_args(argv)
+    try:
+        job_file = __read_job_file(args.job_file)
+    except (OSError, ValueError, KeyError, TypeError) as error:
+        print('xdmod-data: invalid job file: ' + str(error), file=sys.stderr)
+        return 2
+    unknown_jobs = set(args.jobs or ()) - set(
+        job['name'] for job in job_file['jobs']
+    )
+    if unknown_jobs:
+        print(
+            'xdmod-data: unknown jobs: ' + ', '.join(sorted(unknown_jobs)),
+            file=sys.stderr,
+        )
+        return 2
+    jobs = [
+        job for job in job_file['jobs']
+        if not args.jobs or job['name'] in args.jobs
+    ]
+    start_time = time.monotonic()
+    # The output files are created with the permissions given by the umask,
+    # which can only be read by changing it, before any jobs are running.
+    umask = os.umask(0o022)
+    os.umask(umask)
+    try:
+        reports = __run_jobs(args, job_file, jobs, umask)
+    except Exception as error:
+        # E.g., the XDMoD server cannot be reached or the API token is not
+        # set.
+        print('xdmod-data: ' + __format_error(error), file=sys.stderr)
+        return 1
+    num_failed = sum(1 for report in reports if report['error'] is not None)
+    print(
+        'xdmod-data: ' + str(len(reports) - num_failed) + ' succeeded, '
+        + str(num_failed) + ' failed in '
+        + __format_seconds(time.monotonic() - start_time) + '.',
+    )
+    return 1 if num_failed else 0
+
+
+def __run_jobs(args, job_file, jobs, umask):
+    # All the jobs share a single client, and with it, its pool of
+    # connections and its caches.
+    with DataWarehouse(
+        args.xdmod_host or job_file['xdmod_host'],
+        **job_file.get('options', {}),
+    ) as dw:
+        with ThreadPoolExecutor(
+            max_workers=args.max_workers or job_file.get('max_workers', 4),
+        ) as executor:
+            return list(executor.map(
+                lambda job: __run_job(dw, job, umask),
+                jobs,
+            ))
+
+
+def __parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog='xdmod-data',
+        description='Run the queries listed in a JSON job file against an'
+        + ' XDMoD data warehouse and write the results to CSV, Parquet, or'
+        + ' NDJSON files. The API token is read from the XDMOD_API_TOKEN'
+        + ' environment variable.',
+    )
+    parser.add_argument('job_file', help='path of the JSON job file')
+    parser.add_argument(
+        '--xdmod-host',
+        help='URL of the XDMoD server, overriding the job file',
+    )
+    parser.add_argument(
+        '--max-workers',
+        type=int,
+        help='maximum number of jobs to run concurrently, overriding the job'
+        + ' file (default: 4)',
+    )
+    parser.add_argument(
+        '--job',
+        action='append',
+        dest='jobs',
+        metavar='NAME',
+        help='only run the job with this name; can be given more than once',
+    )
+    args = parser.parse_args(argv)
+    if args.max_workers is not None and args.max_workers < 1:
+        parser.error('--max-workers must be positive')
+    return args
+
+
+def __read_job_file(path):
+    # A job file is a JSON object such as:
+    # {
+    #     "xdmod_host": "https://xdmod.access-ci.org",
+    #     "max_workers": 4,
+    #     "options": {"cache_path": "xdmod-cache.sqlite"},
+    #     "jobs": [
+    #         {
+    #             "name": "cpu-hours-by-queue",
+    #             "method": "get_data",
+    #             "params": {"duration": ["2024-01-01", "2024-12-31"],
+    #                        "dimension": "Queue"},
+    #             "output": "cpu-hours-by-queue.csv"
+    #         }
+    #     ]
+    # }
+    with open(path) as job_file:
+        result = json.load(job_file)
+    if not isinstance(result, dict) or not isinstance(
+        result.get('jobs'),
+        list,
+    ):
+        raise ValueError('must be an object with a list of `jobs`.')
+    if 'xdmod_host' not in result:
+        raise KeyError('`xdmod_host` is missing.')
+    names = set()
+    for job in result['jobs']:
+        __validate_job(job, names)
+    return result
+
+
+def __validate_job(job, names):
+    for key in ('name', 'method', 'output'):
+        if key not in job:
+            raise KeyError('every job must have a `' + key + '`.')
+    if job['name'] in names:
+        raise ValueError("job name '" + job['name'] + "' is not unique.")
+    names.add(job['name'])
+    if job['method'] not in _METHODS:
+        raise ValueError(
+            "job '" + job['name'] + "' has an invalid `method`. Valid values"
+            + " are: '" + "', '".join(_METHODS) + "'.",
+        )
+    __get_format(job)
+    if not isinstance(job.get('params', {}), dict):
+        raise TypeError(
+            "`params` of job '" + job['name'] + "' must be an object.",
+        )
+
+
+def __get_format(job):
+    if 'format' in job:
+        if job['format'] not in _FORMATS.values():
+            raise ValueError(
+                "job '" + job['name'] + "' has an invalid `format`.",
+            )
+        return job['format']
+    extension = os.path.splitext(job['output'])[1].lower()
+    if extension not in _FORMATS:
+        raise ValueError(
+            "the format of the output of job '" + job['name'] + "' cannot be"
+            + ' determined; give a `format` of csv, parquet, or ndjson.',
+        )
+    return _FORMATS[extension]
+
+
+def __run_job(dw, job, umask):
+    start_time = time.monotonic()
+    report = {'name': job['name'], 'error': None, 'num_rows': None}
+    try:
+        data = getattr(dw, job['method'])(**job.get('params', {}))
+        report['num_rows'] = len(data)
+        __write(data, job['output'], __get_format(job), umask)
+    except Exception as error:
+        report['error'] = (
+            type(error).__name__ + ': ' + __format_error(error)
+        )
+    report['seconds'] = time.monotonic() - start_time
+    if report['error'] is None:
+        print(
+            job['name'] + ': wrote ' + str(report['num_rows']) + ' rows to '
+            + job['output'] + ' in ' + __format_seconds(report['seconds'])
+            + '.',
+        )
+    else:
+        print(
+            job['name'] + ': FAILED after '
+            + __format_seconds(report['seconds']) + ': ' + report['error'],
+            file=sys.stderr,
+        )
+    return report
+
+
+def __write(data, path, format_, umask):
+    data = _response_processor._flatten_data(data)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    _files._write_atomically(
+        path,
+        lambda temporary_path: __write_data(data, temporary_path, format_),
+        0o666 & ~umask,
+    )
+
+
+def __write_data(data, path, format_):
+    if format_ == 'csv':
+        data.to_csv(path, index=False)
+    elif format_ == 'parquet':
+        data.to_parquet(path, index=False)
+    else:
+        data.to_json(path, orient='records', lines=True, date_format='iso')
+
+
+def __format_error(error):
+    # Errors from the connection can contain the URL with the API token, which
+    # must not end up in the logs of scheduled exports.
+    message = str(error)
+    token = os.environ.get('XDMOD_API_TOKEN')
+    if token:
+        message = message.replace(token, '<XDMOD_API_TOKEN>')
+    return message
+
+
+def __format_seconds(seconds):
+    return '{:.2f} s'.format(seconds)
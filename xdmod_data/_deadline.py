@@ -0,0 +1,49 @@
+import contextlib
+import contextvars
+import time
+
+# The deadline of the current call, if any, as a tuple of the time by which
+# it must complete and the number of seconds it was given. It is a context
+# variable so that it applies to every request made by the call, including
+# those made by threads started through _bind().
+__deadline = contextvars.ContextVar('deadline', default=None)
+
+
+@contextlib.contextmanager
+def _start(seconds):
+    if seconds is None:
+        yield
+        return
+    token = __deadline.set((time.monotonic() + seconds, seconds))
+    try:
+        yield
+    finally:
+        __deadline.reset(token)
+
+
+def _get():
+    return __deadline.get()
+
+
+def _get_remaining_time():
+    # Return None if there is no deadline.
+    deadline = __deadline.get()
+    if deadline is None:
+        return None
+    remaining_time = deadline[0] - time.monotonic()
+    if remaining_time <= 0:
+        raise _get_error()
+    return remaining_time
+
+
+def _get_error():
+    return TimeoutError(
+        'The `deadline` of ' + str(__deadline.get()[1]) + ' s was exceeded.',
+    )
+
+
+def _bind(function):
+    # Return a function that calls `function` with the deadline of the
+    # caller, from any thread and any number of times concurrently.
+    context = contextvars.copy_context()
+    return lambda *args: context.copy().run(function, *args)
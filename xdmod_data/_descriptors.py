@@ -1,19 +1,31 @@
+from xdmod_data._single_flight import _SingleFlight
+
+
 class _Descriptors:
     def __init__(self, http_requester):
         self.__http_requester = http_requester
         self.__aggregate = None
         self.__raw = None
+        self.__single_flight = _SingleFlight()
 
     def _get_aggregate(self):
         if self.__aggregate is None:
-            self.__aggregate = self.__request_aggregate()
+            self.__single_flight._do('aggregate', self.__load_aggregate)
         return self.__aggregate
 
     def _get_raw(self):
         if self.__raw is None:
-            self.__raw = self.__request_raw()
+            self.__single_flight._do('raw', self.__load_raw)
         return self.__raw
 
+    def __load_aggregate(self):
+        if self.__aggregate is None:
+            self.__aggregate = self.__request_aggregate()
+
+    def __load_raw(self):
+        if self.__raw is None:
+            self.__raw = self.__request_raw()
+
     def __request_aggregate(self):
         response = self.__http_requester._request_json(
             '/controllers/metric_explorer.php',
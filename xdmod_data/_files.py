@@ -0,0 +1,43 @@
+import contextlib
+import os
+import tempfile
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+
+def _write_atomically(path, write, mode=None):
+    # Call `write` with the path of a new temporary file in the directory of
+    # `path` and then move the file to `path`, so that an interrupted write
+    # never leaves a partial file in place. The temporary file has a unique
+    # name so that concurrent writers of the same path do not collide. It is
+    # created readable only by its owner, unless `mode` is given.
+    directory = os.path.dirname(path)
+    (file_descriptor, temporary_path) = tempfile.mkstemp(
+        prefix='.' + os.path.basename(path) + '.',
+        suffix='.tmp',
+        dir=directory or os.curdir,
+    )
+    os.close(file_descriptor)
+    try:
+        write(temporary_path)
+        if mode is not None:
+            os.chmod(temporary_path, mode)
+        os.replace(temporary_path, path)
+    finally:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+
+
+@contextlib.contextmanager
+def _lock(path):
+    # Hold an exclusive lock on the file at `path`, which is created if it
+    # does not exist, so that processes sharing a directory can update its
+    # files in turn. The lock is released when the file is closed. Where
+    # `fcntl` is not available, e.g., on Windows, the lock does nothing.
+    with open(path, 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
@@ -0,0 +1,147 @@
+from collections import OrderedDict
+import threading
+import time
+
+
+class _Governor:
+    # Limits the number of requests in flight to the XDMoD server with
+    # additive increase, multiplicative decrease (AIMD): the limit grows by
+    # about one per round trip while the server responds normally, and is
+    # halved when it is overloaded, i.e., it responds with 429 or 5xx, cannot
+    # be reached, or takes much longer than the same request usually does.
+    # Latencies are only compared between identical requests, since requests
+    # for different data, e.g., timeseries over different durations, can
+    # legitimately take very different amounts of time. At most one decrease
+    # is made per round trip, i.e., only requests sent after the last
+    # decrease can cause another one.
+    #
+    # After a number of consecutive overloaded responses, the circuit opens:
+    # requests fail immediately until the cooldown has passed, after which a
+    # single request is let through to check whether the server has
+    # recovered.
+    def __init__(
+        self,
+        xdmod_host,
+        max_limit,
+        latency_tolerance=4,
+        min_latency_threshold=1,
+        failure_threshold=5,
+        cooldown=30,
+        max_num_latencies=1000,
+    ):
+        self.__xdmod_host = xdmod_host
+        self.__max_limit = max_limit
+        self.__latency_tolerance = latency_tolerance
+        self.__min_latency_threshold = min_latency_threshold
+        self.__failure_threshold = failure_threshold
+        self.__cooldown = cooldown
+        self.__max_num_latencies = max_num_latencies
+        self.__condition = threading.Condition()
+        self.__limit = float(max_limit)
+        self.__num_in_flight = 0
+        self.__latencies = OrderedDict()
+        self.__last_decrease_time = float('-inf')
+        self.__num_consecutive_failures = 0
+        self.__open_until = None
+        self.__probe_start_time = None
+
+    def _acquire(self, timeout=None):
+        # Wait for a free slot and return the time at which the request is
+        # sent, or None if no slot was free within `timeout` seconds.
+        end_time = None if timeout is None else time.monotonic() + timeout
+        with self.__condition:
+            while True:
+                is_probe = self.__check_circuit()
+                if is_probe or self.__num_in_flight < int(self.__limit):
+                    break
+                if end_time is None:
+                    self.__condition.wait()
+                elif not self.__condition.wait(end_time - time.monotonic()):
+                    return None
+            self.__num_in_flight += 1
+            start_time = time.monotonic()
+            if is_probe:
+                self.__probe_start_time = start_time
+            return start_time
+
+    def _record(self, start_time, key, status_code):
+        # Update the limit and the circuit with the outcome of a request;
+        # `status_code` is None if no response was received.
+        now = time.monotonic()
+        latency = now - start_time
+        with self.__condition:
+            if status_code is None or status_code == 429 or (
+                status_code >= 500 and status_code != 501
+            ):
+                self.__record_failure(start_time, now)
+            else:
+                self.__record_success(start_time, now, key, latency)
+            self.__condition.notify_all()
+
+    def _abandon(self, start_time):
+        # Forget a request whose outcome is unknown, e.g., because it was cut
+        # short by the deadline of the call, so that if it was checking
+        # whether the server has recovered, the next request checks instead.
+        with self.__condition:
+            if start_time == self.__probe_start_time:
+                self.__probe_start_time = None
+
+    def _release(self):
+        # Free the slot of a request once its response has arrived.
+        with self.__condition:
+            self.__num_in_flight -= 1
+            self.__condition.notify_all()
+
+    def __check_circuit(self):
+        # Raise if the circuit is open, and return whether the request is the
+        # single one that checks whether the server has recovered.
+        if self.__open_until is None:
+            return False
+        remaining_time = self.__open_until - time.monotonic()
+        if remaining_time <= 0 and self.__probe_start_time is None:
+            return True
+        raise RuntimeError(
+            "Requests to xdmod_host '" + self.__xdmod_host + "' are"
+            + ' suspended after ' + str(self.__failure_threshold)
+            + ' consecutive failed requests; try again in '
+            + str(max(1, round(remaining_time))) + ' s.',
+        )
+
+    def __record_failure(self, start_time, now):
+        self.__num_consecutive_failures += 1
+        if (
+            start_time == self.__probe_start_time
+            or self.__num_consecutive_failures >= self.__failure_threshold
+        ):
+            self.__open_until = now + self.__cooldown
+            self.__probe_start_time = None
+        self.__decrease(start_time, now)
+
+    def __record_success(self, start_time, now, key, latency):
+        self.__num_consecutive_failures = 0
+        self.__open_until = None
+        self.__probe_start_time = None
+        # The usual latency of each request is smoothed so that it follows
+        # gradual changes, and only that of the most recent requests is kept.
+        usual_latency = self.__latencies.pop(key, None)
+        if usual_latency is not None and latency > max(
+            self.__latency_tolerance * usual_latency,
+            self.__min_latency_threshold,
+        ):
+            self.__decrease(start_time, now)
+        else:
+            self.__limit = min(
+                self.__limit + 1 / self.__limit,
+                self.__max_limit,
+            )
+        self.__latencies[key] = (
+            latency if usual_latency is None
+            else 0.8 * usual_latency + 0.2 * latency
+        )
+        if len(self.__latencies) > self.__max_num_latencies:
+            self.__latencies.popitem(last=False)
+
+    def __decrease(self, start_time, now):
+        if start_time > self.__last_decrease_time:
+            self.__limit = max(self.__limit / 2, 1)
+            self.__last_decrease_time = now
@@ -0,0 +1,65 @@
+from collections import deque
+from concurrent.futures import Future, as_completed, wait
+import threading
+import time
+import xdmod_data._deadline as _deadline
+
+
+class _Hedger:
+    # A request is hedged by sending a duplicate once it has taken longer
+    # than the 95th percentile of the latencies of recent requests of the
+    # same kind, and using whichever response arrives first. By construction,
+    # only about 5% of requests are duplicated. Requests of a kind are only
+    # hedged once enough of their latencies have been observed.
+    def __init__(self, num_latencies=100, min_num_latencies=20):
+        self.__num_latencies = num_latencies
+        self.__min_num_latencies = min_num_latencies
+        self.__latencies = {}
+        self.__lock = threading.Lock()
+
+    def _run(self, key, function):
+        delay = self.__get_delay(key)
+        if delay is None:
+            return self.__time(key, function)
+        futures = [self.__start(key, function)]
+        if not wait(futures, timeout=delay).done:
+            futures.append(self.__start(key, function))
+        error = None
+        for future in as_completed(futures):
+            try:
+                return future.result()
+            except Exception as e:
+                error = e if error is None else error
+        raise error
+
+    def __get_delay(self, key):
+        with self.__lock:
+            latencies = sorted(self.__latencies.get(key, ()))
+        if len(latencies) < self.__min_num_latencies:
+            return None
+        return latencies[int(0.95 * (len(latencies) - 1))]
+
+    def __time(self, key, function):
+        start_time = time.monotonic()
+        result = function()
+        latency = time.monotonic() - start_time
+        with self.__lock:
+            self.__latencies.setdefault(
+                key,
+                deque(maxlen=self.__num_latencies),
+            ).append(latency)
+        return result
+
+    def __start(self, key, function):
+        # Run the function in a separate thread, with the deadline of the
+        # caller, since the thread of the slower request cannot be stopped.
+        future = Future()
+
+        def run():
+            try:
+                future.set_result(self.__time(key, function))
+            except BaseException as e:
+                future.set_exception(e)
+
+        threading.Thread(target=_deadline._bind(run), daemon=True).start()
+        return future
@@ -1,14 +1,37 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import contextlib
+from datetime import date, timedelta
+import itertools
 import json
+import multiprocessing
 import os
 import re
-import requests
 from urllib.parse import urlencode
+import xdmod_data._cassette as _cassette
+import xdmod_data._checkpoint as _checkpoint
+import xdmod_data._deadline as _deadline
+from xdmod_data._governor import _Governor
+from xdmod_data._hedger import _Hedger
+import xdmod_data._pipeline as _pipeline
+import xdmod_data._raw_data_builder as _raw_data_builder
+import xdmod_data._response_processor as _response_processor
+from xdmod_data._single_flight import _SingleFlight
 import xdmod_data._validator as _validator
 from xdmod_data.__version__ import __title__, __version__
+import xdmod_data.transport as _transport
 
 
 class _HttpRequester:
-    def __init__(self, xdmod_host):
+    def __init__(
+        self,
+        xdmod_host,
+        response_cache=None,
+        transport='requests',
+        max_filter_values=500,
+        timeout=(10, 300),
+        hedge_requests=False,
+    ):
         self.__in_runtime_context = False
         _validator._assert_str('xdmod_host', xdmod_host)
         xdmod_host = re.sub('/+$', '', xdmod_host)
@@ -23,69 +46,181 @@ class _HttpRequester:
             'Authorization': 'Bearer ' + self.__api_token,
             'User-Agent': __title__ + ' Python v' + __version__,
         }
-        self.__requests_session = None
+        self.__transport = _transport._get_transport(transport)
+        self.__transport_accepts_timeout = _transport._accepts_timeout(
+            self.__transport,
+        )
         self.__raw_data_limit = None
+        self.__max_workers = 8
+        self.__max_filter_values = max_filter_values
+        self.__raw_data_chunk_size = 2 ** 20
+        self.__raw_data_queue_size = 8
+        self.__response_cache = response_cache
+        self.__single_flight = _SingleFlight()
+        self.__governor = _Governor(xdmod_host, self.__max_workers)
+        self.__timeout = timeout
+        self.__hedger = _Hedger() if hedge_requests else None
 
-    def _start_up(self):
+    def _start_up(self, check_connection=True):
         self.__in_runtime_context = True
-        self.__requests_session = requests.Session()
-        self.__assert_connection_to_xdmod_host()
+        if check_connection:
+            self.__assert_connection_to_xdmod_host()
+        if self.__response_cache is not None:
+            self.__response_cache._open()
 
     def _tear_down(self):
-        if self.__requests_session is not None:
-            self.__requests_session.close()
+        if self.__response_cache is not None:
+            self.__response_cache._close()
+        self.__transport.close()
         self.__in_runtime_context = False
 
     def _request_data(self, params):
-        return self.__request(
-            path='/controllers/user_interface.php',
-            post_fields=self.__get_data_post_fields(params),
+        # Only filters on the dimension by which the data are grouped are
+        # split, since each resulting request then returns different
+        # dimension values, and the responses can be merged without
+        # combining any of their values.
+        params_list = self.__split_filters(params, (params['dimension'],))
+        if len(params_list) > 1 and params['dataset_type'] == 'timeseries':
+            # The server orders the columns of a timeseries by their
+            # aggregate values, which are needed to order the columns of the
+            # merged responses in the same way.
+            params_list += [
+                {**params, 'dataset_type': 'aggregate'}
+                for params in params_list
+            ]
+        responses = self._map_concurrently(
+            lambda params: self.__request(
+                path='/controllers/user_interface.php',
+                post_fields=self.__get_data_post_fields(params),
+            ),
+            params_list,
+        )
+        if len(responses) == 1:
+            return responses[0]
+        return _response_processor._merge_get_data_responses(
+            params['dataset_type'],
+            responses,
         )
 
+    def _request_data_concurrently(self, params_list):
+        return self._map_concurrently(self._request_data, params_list)
+
+    def _map_concurrently(self, function, items):
+        items = list(items)
+        if len(items) < 2:
+            return [function(item) for item in items]
+        with ThreadPoolExecutor(
+            max_workers=min(self.__max_workers, len(items)),
+        ) as executor:
+            return list(executor.map(_deadline._bind(function), items))
+
     def _request_raw_data(self, params):
-        url_params = self.__get_raw_data_url_params(params)
+        # The rows returned for different values of a filter are different,
+        # so the results of the requests can simply be appended to the same
+        # builder, in order. The following requests are made while the rows
+        # of the current one are appended.
+        params_list = self.__split_filters(params, tuple(params['filters']))
         # Once XDMoD 10.5 is no longer supported, there will be no need to call
-        # __get_raw_data_limit(), and the if/else statement below will not be
-        # necessary — only the body of the 'if' branch will be needed.
+        # __get_raw_data_limit().
         limit = self.__get_raw_data_limit()
-        data = []
-        if limit == 'NA':
-            response_iter_lines = self.__request(
-                path='/rest/v1/warehouse/raw-data?' + url_params,
-                post_fields=None,
-                stream=True,
+        checkpoints = [
+            self.__get_checkpoint(part_params, limit)
+            for part_params in params_list
+        ]
+        with self.__get_raw_data_pool(params['num_processes']) as pool:
+            parts = [
+                self.__iter_raw_data(part_params, limit, pool, checkpoint)
+                for (part_params, checkpoint) in zip(params_list, checkpoints)
+            ]
+            if len(parts) == 1:
+                result = self.__build_raw_data(params, limit, parts[0])
+            else:
+                result = self.__build_raw_data(
+                    params,
+                    limit,
+                    _pipeline._chain(
+                        parts,
+                        self.__raw_data_queue_size,
+                        self.__max_workers - 1,
+                    ),
+                )
+        # The parts are produced ahead of the builder, so the checkpoints are
+        # only removed once the builder has every part.
+        for checkpoint in checkpoints:
+            if checkpoint is not None:
+                checkpoint._remove()
+        return result
+
+    def __get_raw_data_pool(self, num_processes):
+        # A single pool of processes decodes the chunks of all the requests.
+        if num_processes == 1:
+            return contextlib.nullcontext()
+        return ProcessPoolExecutor(
+            max_workers=num_processes,
+            mp_context=multiprocessing.get_context('spawn'),
+        )
+
+    def __get_checkpoint(self, params, limit):
+        if params['checkpoint_dir'] is None:
+            return None
+        return _checkpoint._Checkpoint(
+            params['checkpoint_dir'],
+            {
+                'xdmod_host': self.__xdmod_host,
+                'url_params': self.__get_raw_data_url_params(params),
+                'limit': limit,
+            },
+        )
+
+    def __iter_raw_data(self, params, limit, pool, checkpoint):
+        url_params = self.__get_raw_data_url_params(params)
+        if checkpoint is not None:
+            return self.__iter_checkpointed_raw_data(
+                params,
+                limit,
+                pool,
+                checkpoint,
             )
-            i = 0
-            for line in response_iter_lines:
-                line_text = line.decode('utf-8').replace('\x1e', '')
-                line_json = json.loads(line_text)
-                if i == 0:
-                    response = {'fields': line_json}
-                else:
-                    data.append(line_json)
-                    # Only print every 10,000 rows to avoid I/O rate errors.
-                    if params['show_progress'] and i % 10000 == 0:
-                        self.__print_progress_msg(i, '\r')
-                i += 1
-            if params['show_progress']:
-                self.__print_progress_msg(i, 'DONE\n')
+        elif limit == 'NA':
+            return self.__iter_streamed_raw_data(url_params, params, pool)
         else:
-            num_rows = limit
-            offset = 0
-            while num_rows == limit:
-                response = self._request_json(
-                    path='/rest/v1/warehouse/raw-data?' + url_params
-                    + '&offset=' + str(offset),
-                )
-                partial_data = response['data']
-                data += partial_data
-                if params['show_progress']:
-                    self.__print_progress_msg(len(data), '\r')
-                num_rows = len(partial_data)
-                offset += limit
-            if params['show_progress']:
-                self.__print_progress_msg(len(data), 'DONE\n')
-        return (data, response['fields'])
+            return self.__iter_paged_raw_data(url_params, limit, 0)
+
+    def __build_raw_data(self, params, limit, units):
+        # Once XDMoD 10.5 is no longer supported, only the body of the 'if'
+        # branch below will be needed.
+        if limit == 'NA' and params['checkpoint_dir'] is None:
+            # The header of the stream counts as a line, and progress is only
+            # printed every 10,000 rows to avoid I/O rate errors.
+            (num_header_lines, progress_interval) = (1, 10000)
+        else:
+            (num_header_lines, progress_interval) = (0, 1)
+        builder = None
+        total_num_rows = 0
+        try:
+            for (fields, unit_columns, num_rows) in units:
+                if builder is None:
+                    builder = _raw_data_builder._get_builder(fields, params)
+                builder._append(unit_columns)
+                total_num_rows += num_rows
+                if params['show_progress'] and (
+                    total_num_rows // progress_interval
+                    > (total_num_rows - num_rows) // progress_interval
+                ):
+                    self.__print_progress_msg(total_num_rows, '\r')
+        except BaseException:
+            if builder is not None:
+                builder._discard()
+            raise
+        if builder is None:
+            # No part returned any fields.
+            builder = _raw_data_builder._get_builder([], params)
+        if params['show_progress']:
+            self.__print_progress_msg(
+                total_num_rows + num_header_lines,
+                'DONE\n',
+            )
+        return builder
 
     def _request_filter_values(self, realm_id, dimension_id):
         limit = 10000
@@ -108,33 +243,130 @@ class _HttpRequester:
             offset += limit
         return data
 
+    def _search_filter_values(self, realm_id, dimension_id, search_text):
+        # Return the first page of the values whose labels contain the search
+        # text, and whether it is the only page. Servers that do not support
+        # searching return the first page of all the values.
+        limit = 100
+        response = self._request_json(
+            path='/controllers/metric_explorer.php',
+            post_fields={
+                'operation': 'get_dimension',
+                'realm': realm_id,
+                'dimension_id': dimension_id,
+                'search_text': search_text,
+                'start': 0,
+                'limit': limit,
+            },
+        )
+        return (response['data'], len(response['data']) < limit)
+
+    def _warm_up(self):
+        self.__get_raw_data_limit()
+
     def _request_json(self, path, post_fields=None):
         response = self.__request(path, post_fields)
         return json.loads(response)
 
     def __assert_connection_to_xdmod_host(self):
         try:
-            self.__request()
+            self.__probe_xdmod_host()
         except RuntimeError as e:  # pragma: no cover
             raise RuntimeError(
                 "Could not connect to xdmod_host '" + self.__xdmod_host
                 + "': " + str(e),
             ) from None
 
+    def __probe_xdmod_host(self):
+        # A HEAD request of the root page only transfers its headers, rather
+        # than the whole web interface. Servers that do not support HEAD
+        # requests are checked with a GET request instead.
+        response = self.__send('HEAD', self.__xdmod_host)
+        response.close()
+        if response.status_code in (405, 501):  # pragma: no cover
+            self.__request()
+        elif response.status_code != 200:  # pragma: no cover
+            raise RuntimeError('Error ' + str(response.status_code))
+
     def __request(self, path='', post_fields=None, stream=False):
         _validator._assert_runtime_context(self.__in_runtime_context)
         url = self.__xdmod_host + path
+        if stream:
+            return self.__send_request(url, post_fields, stream)
+        # Identical requests made concurrently, e.g., by threads that all
+        # need the same filter values, share a single response.
+        return self.__single_flight._do(
+            (
+                url,
+                None if post_fields is None
+                else tuple(sorted(post_fields.items())),
+            ),
+            lambda: self.__request_text(url, post_fields),
+        )
+
+    def __request_text(self, url, post_fields):
+        if self.__response_cache is None or url == self.__xdmod_host:
+            return self.__send_text_request(url, post_fields)
+        text = self.__response_cache._get(self.__api_token, url, post_fields)
+        if text is None:
+            text = self.__send_text_request(url, post_fields)
+            self.__response_cache._set(
+                self.__api_token,
+                url,
+                post_fields,
+                text,
+            )
+        return text
+
+    def __send_text_request(self, url, post_fields):
+        if self.__hedger is None or not self.__is_hedgeable(url, post_fields):
+            return self.__send_request(url, post_fields, False)
+        return self.__hedger._run(
+            self.__get_request_kind(url, post_fields),
+            lambda: self.__send_request(url, post_fields, False),
+        )
+
+    def __is_hedgeable(self, url, post_fields):
+        # Only small requests are hedged: descriptors, filter values, and
+        # aggregate data. Timeseries and raw data can be large enough that
+        # duplicating the slowest of them would add much load to the server.
+        if post_fields is None:
+            return url.startswith(
+                self.__xdmod_host + '/rest/v1/warehouse/export/realms',
+            )
+        return post_fields.get('operation') in (
+            'get_dw_descripter',
+            'get_dimension',
+        ) or post_fields.get('dataset_type') == 'aggregate'
+
+    def __send_request(self, url, post_fields, stream):
+        response = self.__send_request_with_transport(url, post_fields, stream)
+        if stream:
+            return self.__iter_response_content(response)
+        try:
+            return response.text
+        finally:
+            response.close()
+
+    def __iter_response_content(self, response):
+        try:
+            for chunk in response.iter_content(self.__raw_data_chunk_size):
+                _deadline._get_remaining_time()
+                yield chunk
+        finally:
+            response.close()
+
+    def __send_request_with_transport(self, url, post_fields, stream):
         if post_fields:
-            post_fields['Bearer'] = self.__api_token
-            response = self.__requests_session.post(
+            response = self.__send(
+                'POST',
                 url,
-                headers=self.__headers,
-                data=post_fields,
+                data={**post_fields, 'Bearer': self.__api_token},
             )
         else:
             url += '&' if '?' in url else '?'
             url += 'Bearer=' + self.__api_token
-            response = self.__requests_session.get(url, headers=self.__headers)
+            response = self.__send('GET', url, stream=stream)
         if response.status_code != 200:
             msg = ''
             try:
@@ -146,13 +378,292 @@ class _HttpRequester:
                 msg = (
                     ': Make sure XDMOD_API_TOKEN is set to a valid API token.'
                 )
+            response.close()
             raise RuntimeError(
                 'Error ' + str(response.status_code) + msg,
             ) from None
-        if stream:
-            return response.iter_lines()
-        else:
-            return response.text
+        return response
+
+    def __send(self, method, url, data=None, stream=False):
+        # Every request waits for a slot from the governor, which limits the
+        # number of requests in flight to what the server can handle. The
+        # slot of a streamed request is released once its headers arrive,
+        # since reading its body can wait for the consumer of the data, e.g.,
+        # while the parts of a split request are read in order, and must not
+        # keep the part being read from getting a slot.
+        start_time = self.__governor._acquire(
+            _deadline._get_remaining_time(),
+        )
+        if start_time is None:
+            raise _deadline._get_error()
+        status_code = None
+        is_expired = False
+        try:
+            response = self.__transport.request(
+                method,
+                url,
+                self.__headers,
+                data=data,
+                stream=stream,
+                **(
+                    {'timeout': self.__get_timeout()}
+                    if self.__transport_accepts_timeout
+                    else {}
+                ),
+            )
+            status_code = response.status_code
+            return response
+        except Exception:
+            # A request cut short by the deadline of the call says nothing
+            # about the health of the server.
+            is_expired = self.__is_deadline_exceeded()
+            if is_expired:
+                raise _deadline._get_error() from None
+            raise
+        finally:
+            if is_expired:
+                self.__governor._abandon(start_time)
+            else:
+                self.__governor._record(
+                    start_time,
+                    _cassette._get_key(method, url, data),
+                    status_code,
+                )
+            self.__governor._release()
+
+    def __get_timeout(self):
+        # Each request times out by the deadline of the call, if any.
+        remaining_time = _deadline._get_remaining_time()
+        if remaining_time is None:
+            return self.__timeout
+        if self.__timeout is None:
+            return (remaining_time, remaining_time)
+        return tuple(
+            min(seconds, remaining_time) for seconds in self.__timeout
+        )
+
+    def __is_deadline_exceeded(self):
+        try:
+            _deadline._get_remaining_time()
+        except TimeoutError:
+            return True
+        return False
+
+    def __get_request_kind(self, url, post_fields):
+        return (
+            url.partition('?')[0],
+            None if post_fields is None else post_fields.get('operation'),
+        )
+
+    def __iter_checkpointed_raw_data(self, params, limit, pool, checkpoint):
+        if limit == 'NA':
+            return self.__iter_streamed_raw_data_shards(
+                params,
+                checkpoint,
+                pool,
+            )
+        return self.__iter_checkpointed_raw_data_pages(
+            params,
+            limit,
+            checkpoint,
+        )
+
+    def __iter_streamed_raw_data_shards(self, params, checkpoint, pool):
+        # A stream cannot be resumed part of the way through, so the
+        # duration is split into shards of one calendar month that are each
+        # requested separately.
+        for (start_date, end_date) in self.__get_raw_data_shards(params):
+            unit = str(start_date) + '_' + str(end_date)
+            if checkpoint._is_completed(unit):
+                columns = checkpoint._load(unit)
+                yield (
+                    checkpoint._get_fields(),
+                    columns,
+                    len(columns[0]) if columns else 0,
+                )
+                continue
+            url_params = self.__get_raw_data_url_params({
+                **params,
+                'start_date': start_date,
+                'end_date': end_date,
+            })
+            (fields, builder) = ([], None)
+            for (fields, chunk_columns, _) in self.__iter_streamed_raw_data(
+                url_params,
+                params,
+                pool,
+            ):
+                if builder is None:
+                    builder = _raw_data_builder._RawDataBuilder(fields)
+                builder._append(chunk_columns)
+            columns = [] if builder is None else builder._columns
+            checkpoint._save(unit, fields, columns)
+            yield (fields, columns, len(columns[0]) if columns else 0)
+
+    def __iter_checkpointed_raw_data_pages(self, params, limit, checkpoint):
+        page_num = 0
+        num_rows = limit
+        while num_rows == limit and checkpoint._is_completed(str(page_num)):
+            columns = checkpoint._load(str(page_num))
+            num_rows = len(columns[0]) if columns else 0
+            yield (checkpoint._get_fields(), columns, num_rows)
+            page_num += 1
+        if num_rows < limit:
+            return
+        for (fields, page_columns, num_rows) in self.__iter_paged_raw_data(
+            self.__get_raw_data_url_params(params),
+            limit,
+            page_num * limit,
+        ):
+            checkpoint._save(str(page_num), fields, page_columns)
+            yield (fields, page_columns, num_rows)
+            page_num += 1
+
+    def __get_raw_data_shards(self, params):
+        try:
+            start_date = date.fromisoformat(str(params['start_date']))
+            end_date = date.fromisoformat(str(params['end_date']))
+        except ValueError:
+            # Let the server report the invalid dates.
+            yield (params['start_date'], params['end_date'])
+            return
+        if start_date > end_date:
+            # There are no shards, so let the server respond to the empty
+            # date range as it would without a checkpoint.
+            yield (start_date, end_date)
+            return
+        while start_date <= end_date:
+            next_month_start = date(
+                start_date.year + start_date.month // 12,
+                start_date.month % 12 + 1,
+                1,
+            )
+            yield (
+                start_date,
+                min(end_date, next_month_start - timedelta(days=1)),
+            )
+            start_date = next_month_start
+
+    def __iter_streamed_raw_data(self, url_params, params, pool):
+        response_iter_content = self.__request(
+            path='/rest/v1/warehouse/raw-data?' + url_params,
+            post_fields=None,
+            stream=True,
+        )
+        chunks = _pipeline._prefetch(
+            self.__get_raw_data_chunks(response_iter_content),
+            self.__raw_data_queue_size,
+        )
+        try:
+            first_chunk = next(chunks, None)
+            if first_chunk is None:
+                # The response is empty, without even a header.
+                return
+            (header, _, first_chunk) = first_chunk.partition(b'\n')
+            fields = json.loads(header.replace(b'\x1e', b''))
+            for (chunk_columns, num_rows) in self.__decode_raw_data_chunks(
+                itertools.chain([first_chunk], chunks),
+                len(fields),
+                pool,
+                params['num_processes'],
+            ):
+                yield (fields, chunk_columns, num_rows)
+        finally:
+            chunks.close()
+
+    def __iter_paged_raw_data(self, url_params, limit, offset):
+        # The next page is requested while the current page is decoded.
+        pages = _pipeline._prefetch(
+            self.__get_raw_data_pages(url_params, limit, offset),
+            1,
+        )
+        try:
+            for page in pages:
+                response = json.loads(page)
+                (page_columns, num_rows) = (
+                    _response_processor._get_raw_data_columns(
+                        response['data'],
+                        len(response['fields']),
+                    )
+                )
+                yield (response['fields'], page_columns, num_rows)
+                if num_rows < limit:
+                    break
+        finally:
+            pages.close()
+
+    def __get_raw_data_pages(self, url_params, limit, offset):
+        while True:
+            yield self.__request(
+                path='/rest/v1/warehouse/raw-data?' + url_params
+                + '&offset=' + str(offset),
+            )
+            offset += limit
+
+    def __get_raw_data_chunks(self, response_iter_content):
+        # Yield the content of the response in chunks that each contain only
+        # complete records.
+        remainder = b''
+        for content in response_iter_content:
+            content = remainder + content
+            end = content.rfind(b'\n') + 1
+            if end:
+                yield content[:end]
+            remainder = content[end:]
+        if remainder.strip():
+            yield remainder
+
+    def __decode_raw_data_chunks(
+        self,
+        chunks,
+        num_fields,
+        pool,
+        num_processes,
+    ):
+        if pool is None:
+            for chunk in chunks:
+                yield _response_processor._decode_raw_data_chunk(
+                    chunk,
+                    num_fields,
+                )
+            return
+        # Chunks are decoded in separate processes to use multiple cores, but
+        # their results are yielded in the order the chunks were read. The
+        # number of pending chunks is bounded to limit memory usage.
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(
+                _response_processor._decode_raw_data_chunk,
+                chunk,
+                num_fields,
+            ))
+            if len(pending) >= 2 * num_processes:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def __split_filters(self, params, dimensions):
+        # Each filter on one of the given dimensions that has more values
+        # than the limit is split into parts with at most that many values,
+        # and a request is made for each combination of parts. Repeated
+        # values are removed so that the parts do not overlap.
+        limit = self.__max_filter_values
+        filters_list = [{}]
+        for (dimension, values) in params['filters'].items():
+            values = list(dict.fromkeys(values))
+            if dimension in dimensions and len(values) > limit:
+                parts = [
+                    values[start:start + limit]
+                    for start in range(0, len(values), limit)
+                ]
+            else:
+                parts = [values]
+            filters_list = [
+                {**filters, dimension: part}
+                for filters in filters_list
+                for part in parts
+            ]
+        return [{**params, 'filters': filters} for filters in filters_list]
 
     def __get_data_post_fields(self, params):
         post_fields = {
@@ -0,0 +1,88 @@
+from collections import deque
+import queue
+import threading
+import xdmod_data._deadline as _deadline
+
+
+def _prefetch(items, max_size):
+    # Produce the items in a separate thread so that producing them (e.g.,
+    # reading from the network) overlaps with consuming them. At most
+    # `max_size` items are produced ahead of the consumer, including the one
+    # currently being produced.
+    yield from __consume(__start(items, max_size))
+
+
+def _chain(iterables, max_size, num_ahead):
+    # Yield the items of each of the iterables in turn, each produced as by
+    # _prefetch(), while up to `num_ahead` of the following iterables are
+    # already being produced.
+    iterables = iter(iterables)
+    producers = deque()
+    try:
+        while True:
+            for iterable in iterables:
+                producers.append(__start(iterable, max_size))
+                if len(producers) > num_ahead:
+                    break
+            if not producers:
+                return
+            yield from __consume(producers[0])
+            producers.popleft()
+    finally:
+        for (_, _, stopped) in producers:
+            stopped.set()
+
+
+def __start(items, max_size):
+    slots = threading.Semaphore(max_size)
+    results = queue.Queue()
+    stopped = threading.Event()
+    thread = threading.Thread(
+        target=_deadline._bind(__produce),
+        args=(items, slots, stopped, results),
+        daemon=True,
+    )
+    thread.start()
+    return (slots, results, stopped)
+
+
+def __consume(producer):
+    (slots, results, stopped) = producer
+    try:
+        while True:
+            (is_item, value) = results.get()
+            if not is_item:
+                if value is not None:
+                    raise value
+                return
+            slots.release()
+            yield value
+    finally:
+        stopped.set()
+
+
+def __produce(items, slots, stopped, results):
+    iterator = iter(items)
+    try:
+        while __acquire(slots, stopped):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                break
+            results.put((True, item))
+    except BaseException as error:
+        results.put((False, error))
+        return
+    finally:
+        # Let a generator clean up, e.g., close its response, in the thread
+        # it runs in.
+        if hasattr(iterator, 'close'):
+            iterator.close()
+    results.put((False, None))
+
+
+def __acquire(slots, stopped):
+    while not stopped.is_set():
+        if slots.acquire(timeout=0.1):
+            return not stopped.is_set()
+    return False
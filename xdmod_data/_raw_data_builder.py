@@ -0,0 +1,246 @@
+import numpy as np
+import os
+import pandas as pd
+import sys
+import tempfile
+import warnings
+import weakref
+
+
+def _get_builder(fields, params):
+    if params['memory_limit'] is not None:
+        return _SpillingRawDataBuilder(fields, params['memory_limit'])
+    elif pd.StringDtype().storage == 'pyarrow':
+        return _ArrowRawDataBuilder(fields)
+    else:
+        return _RawDataBuilder(fields)
+
+
+class _RawDataBuilder:
+    def __init__(self, fields):
+        self._fields = fields
+        self._columns = [[] for _ in fields]
+
+    def _append(self, chunk_columns):
+        for (column, chunk_column) in zip(self._columns, chunk_columns):
+            column.extend(chunk_column)
+
+    def _get_data_frame(self):
+        result = pd.DataFrame(
+            data={
+                position: pd.array(column, dtype='string')
+                for (position, column) in enumerate(self._columns)
+            },
+            index=pd.RangeIndex(len(self._columns[0]) if self._columns else 0),
+        ).fillna(value=np.nan)
+        result.columns = pd.Series(data=self._fields, dtype='string')
+        return result
+
+    def _discard(self):
+        # Release any resources held outside of memory.
+        pass
+
+    def _get_table(self):
+        pa = _import_pyarrow("backend='arrow'")
+        return pa.Table.from_arrays(
+            [_get_arrow_strings(pa, column) for column in self._columns],
+            names=list(self._fields),
+        )
+
+
+class _ArrowRawDataBuilder:
+    # Where the 'string' dtype of pandas is backed by Arrow, each decoded
+    # chunk is converted to Arrow arrays as soon as it is appended, so the
+    # Python objects of only one chunk are alive at a time. The final data
+    # frame wraps the chunks of each column without copying them.
+    def __init__(self, fields):
+        import pyarrow
+        self.__pa = pyarrow
+        self.__fields = fields
+        self.__chunks = [[] for _ in fields]
+        self.__num_rows = 0
+
+    def _append(self, chunk_columns):
+        for (chunks, chunk_column) in zip(self.__chunks, chunk_columns):
+            chunks.append(_get_arrow_strings(self.__pa, chunk_column))
+        if chunk_columns:
+            self.__num_rows += len(chunk_columns[0])
+
+    def _get_data_frame(self):
+        result = pd.DataFrame(
+            data={
+                position: pd.arrays.ArrowStringArray(column)
+                for (position, column) in enumerate(self.__get_columns())
+            },
+            index=pd.RangeIndex(self.__num_rows),
+            copy=False,
+        )
+        result.columns = pd.Series(data=self.__fields, dtype='string')
+        return result
+
+    def _discard(self):
+        pass
+
+    def _get_table(self):
+        return self.__pa.Table.from_arrays(
+            self.__get_columns(),
+            names=list(self.__fields),
+        )
+
+    def __get_columns(self):
+        columns = [
+            self.__pa.chunked_array(chunks, type=self.__pa.string())
+            for chunks in self.__chunks
+        ]
+        self.__chunks = [[] for _ in self.__fields]
+        return columns
+
+
+class _SpillingRawDataBuilder(_RawDataBuilder):
+    # Once the decoded columns held in memory are estimated to exceed the
+    # memory limit, they are written as a record batch to a temporary Arrow
+    # IPC file. The final data frame is backed by a memory map of that file,
+    # so data larger than the available memory can be loaded.
+    def __init__(self, fields, memory_limit):
+        super().__init__(fields)
+        self.__pa = _import_pyarrow('memory_limit')
+        self.__memory_limit = memory_limit
+        self.__buffered_size = 0
+        self.__schema = self.__pa.schema(
+            [(str(position), self.__pa.string()) for position in range(
+                len(fields),
+            )],
+        )
+        self.__path = None
+        self.__writer = None
+
+    def _append(self, chunk_columns):
+        super()._append(chunk_columns)
+        if chunk_columns and chunk_columns[0]:
+            self.__buffered_size += len(chunk_columns[0]) * sum(
+                sys.getsizeof(chunk_column[0]) + 8
+                for chunk_column in chunk_columns
+            )
+        if self.__buffered_size > self.__memory_limit:
+            self.__spill()
+
+    def _get_data_frame(self):
+        if self.__writer is None:
+            return super()._get_data_frame()
+        table = self.__read_spilled_table()
+        if pd.StringDtype().storage == 'pyarrow':
+            # The columns wrap the memory-mapped Arrow arrays, as those of
+            # _ArrowRawDataBuilder wrap its chunks, so the strings themselves
+            # are never copied into memory.
+            result = pd.DataFrame(
+                data={
+                    position: pd.arrays.ArrowStringArray(column)
+                    for (position, column) in enumerate(table.columns)
+                },
+                index=pd.RangeIndex(table.num_rows),
+                copy=False,
+            )
+        else:
+            warnings.warn(
+                'The data exceeding `memory_limit` are read back into memory,'
+                + " since the 'string' dtype of pandas is not backed by"
+                + ' Arrow; set pandas.options.mode.string_storage to'
+                + " 'pyarrow' to keep them in a memory map.",
+            )
+            # The data frame has the same types and missing values as one
+            # that is not spilled.
+            result = table.to_pandas(
+                types_mapper={self.__pa.string(): pd.StringDtype()}.get,
+            ).fillna(value=np.nan)
+        result.columns = pd.Series(data=self._fields, dtype='string')
+        return result
+
+    def _get_table(self):
+        if self.__writer is None:
+            return super()._get_table()
+        return self.__read_spilled_table().rename_columns(list(self._fields))
+
+    def _discard(self):
+        if self.__writer is not None:
+            self.__remove_file()
+
+    def __read_spilled_table(self):
+        self.__spill()
+        self.__writer.close()
+        table = self.__pa.ipc.open_file(
+            self.__pa.memory_map(self.__path),
+        ).read_all()
+        # The memory map remains valid after the file is unlinked.
+        self.__remove_file()
+        return table
+
+    def __spill(self):
+        if self.__writer is None:
+            (file_descriptor, self.__path) = tempfile.mkstemp(
+                prefix='xdmod-data-',
+                suffix='.arrow',
+            )
+            os.close(file_descriptor)
+            self.__writer = self.__pa.ipc.new_file(self.__path, self.__schema)
+            # The file is also removed if the builder is discarded before
+            # the data frame is read, e.g., because the download failed.
+            self.__remove_file = weakref.finalize(
+                self,
+                _remove_spilled_file,
+                self.__writer,
+                self.__path,
+            )
+        if self._columns and self._columns[0]:
+            self.__writer.write_batch(self.__pa.record_batch(
+                [
+                    self.__pa.array(
+                        pd.array(column, dtype='string'),
+                        type=self.__pa.string(),
+                    )
+                    for column in self._columns
+                ],
+                schema=self.__schema,
+            ))
+        self._columns = [[] for _ in self._fields]
+        self.__buffered_size = 0
+
+
+def _remove_spilled_file(writer, path):
+    writer.close()
+    try:
+        os.remove(path)
+    except OSError:  # pragma: no cover
+        pass
+
+
+def _get_arrow_strings(pa, values):
+    try:
+        return pa.array(values, type=pa.string())
+    except pa.ArrowTypeError:
+        # Values that are not strings, e.g., numbers, are converted to
+        # strings as pandas would.
+        return pa.array(
+            [None if value is None else str(value) for value in values],
+            type=pa.string(),
+        )
+
+
+def _import_pyarrow(option):
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+    except ImportError:
+        raise ImportError(
+            'The `pyarrow` package is required to use `' + option + '`.',
+        ) from None
+    return pyarrow
+
+
+def _import_polars(option):
+    try:
+        import polars
+    except ImportError:
+        raise ImportError(
+            'The `polars` package is required to use `' + option + '`.',
+        ) from None
+    return polars
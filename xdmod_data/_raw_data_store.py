@@ -0,0 +1,389 @@
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+import json
+import numpy as np
+import os
+import pandas as pd
+import threading
+import time
+import uuid
+import xdmod_data._files as _files
+import xdmod_data._raw_data_builder as _raw_data_builder
+
+
+class _RawDataStore:
+    # Each call to `get_raw_data()` without filters is saved as a download
+    # whose data are split into partitions of at most `partition_size` rows.
+    # The manifest records the minimum and maximum value of each field in
+    # each partition, so that partitions that cannot contain rows matching a
+    # query are never read. Where the durations of downloads overlap, the
+    # most recent download is used. Partitions are saved as Feather files.
+    #
+    # The partitions of downloads that are replaced by a new download are
+    # only deleted once `removal_delay` seconds have passed, since other
+    # processes may still be reading them through an earlier manifest. The
+    # manifest is updated while holding a lock on a file in the directory,
+    # so that processes adding downloads at the same time do not lose each
+    # other's downloads.
+    def __init__(
+        self,
+        directory,
+        partition_size=2 ** 18,
+        max_loaded=32,
+        removal_delay=3600,
+    ):
+        _raw_data_builder._import_pyarrow('raw_data_store_dir')
+        self.__directory = directory
+        self.__manifest_path = os.path.join(directory, 'manifest.json')
+        self.__lock_path = os.path.join(directory, 'manifest.lock')
+        self.__partition_size = partition_size
+        self.__max_loaded = max_loaded
+        self.__removal_delay = removal_delay
+        self.__loaded = OrderedDict()
+        self.__lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _add(self, params, data_frame):
+        download = {
+            'id': uuid.uuid4().hex,
+            'realm': params['realm'],
+            'start_date': str(params['start_date']),
+            'end_date': str(params['end_date']),
+            'fields': list(data_frame.columns),
+            'created': datetime.now().isoformat(),
+            'partitions': [],
+        }
+        data_frame = pd.DataFrame({
+            field: self.__convert_column(data_frame[field])
+            for field in data_frame.columns
+        })
+        for start in range(0, len(data_frame), self.__partition_size):
+            partition = data_frame.iloc[
+                start:start + self.__partition_size
+            ].reset_index(drop=True)
+            file_name = download['id'] + '-' + str(start) + '.feather'
+            _files._write_atomically(
+                os.path.join(self.__directory, file_name),
+                partition.to_feather,
+            )
+            download['partitions'].append({
+                'file': file_name,
+                'stats': self.__get_stats(partition),
+            })
+        with self.__lock, _files._lock(self.__lock_path):
+            manifest = self.__read_manifest()
+            (manifest['downloads'], removed) = self.__partition_downloads(
+                manifest['downloads'],
+                download,
+            )
+            manifest['downloads'].append(download)
+            expired = self.__defer_removal(manifest, removed)
+            self.__write_manifest(manifest)
+        for file_name in expired:
+            self.__remove(file_name)
+
+    def _aggregate(self, params):
+        data = self.__select(params)
+        fields = list(params['fields'])
+        for field in fields:
+            if (
+                len(data) > 0
+                and params['aggregation'] != 'count'
+                and not pd.api.types.is_numeric_dtype(data[field])
+            ):
+                raise ValueError("Field '" + field + "' is not numeric.")
+        keys = list(params['dimensions'])
+        if params['dataset_type'] == 'timeseries':
+            keys = ['Time'] + keys
+            data['Time'] = pd.to_datetime(data['Time']).dt.to_period(
+                self.__get_freq(params),
+            ).dt.start_time
+        if not keys:
+            return data[fields].agg(params['aggregation'])
+        result = data.groupby(keys, observed=True, sort=True)[fields].agg(
+            params['aggregation'],
+        )
+        if keys == ['Time']:
+            result = result.reindex(self.__get_time_index(params))
+        return result
+
+    def __select(self, params):
+        (downloads, realm) = self.__get_downloads(params)
+        fields = self.__get_needed_fields(params)
+        for field in fields:
+            if not any(field in download['fields'] for download in downloads):
+                raise KeyError(
+                    "Field '" + field + "' not found in the raw data store.",
+                )
+        remaining = [self.__get_dates(params)]
+        selections = []
+        for download in sorted(
+            downloads,
+            key=lambda download: download['created'],
+            reverse=True,
+        ):
+            if not set(fields) <= set(download['fields']):
+                continue
+            download_dates = self.__get_dates(download)
+            selections.append((download, [
+                self.__intersect(interval, download_dates)
+                for interval in remaining
+                if self.__intersect(interval, download_dates) is not None
+            ]))
+            remaining = [
+                part
+                for interval in remaining
+                for part in self.__subtract(interval, download_dates)
+            ]
+        if remaining:
+            raise KeyError(
+                "The raw data store does not contain data for realm '"
+                + realm + "' from " + str(remaining[0][0]) + ' to '
+                + str(remaining[0][1]) + ' with the given fields.',
+            )
+        parts = [
+            part
+            for (download, intervals) in selections
+            for part in self.__select_from_download(
+                download,
+                intervals,
+                params,
+            )
+        ]
+        if not parts:
+            return pd.DataFrame(columns=fields + ['Time'])
+        return pd.concat(parts, ignore_index=True)
+
+    def __select_from_download(self, download, intervals, params):
+        time_field = params['time_field']
+        bounds = [
+            (self.__get_timestamp(start), self.__get_timestamp(end + (
+                timedelta(days=1)
+            )))
+            for (start, end) in intervals
+        ]
+        fields = self.__get_needed_fields(params)
+        for partition in download['partitions']:
+            if not self.__may_match(partition['stats'], bounds, params):
+                continue
+            data = self.__load(partition['file'])
+            times = self.__get_times(data[time_field])
+            mask = np.zeros(len(data), dtype=bool)
+            for (start, end) in bounds:
+                mask |= (times >= start) & (times < end)
+            for (field, values) in params['filters'].items():
+                mask &= data[field].isin(
+                    self.__convert_values(data[field], values),
+                ).to_numpy()
+            if mask.any():
+                result = data.loc[mask, fields].copy()
+                result['Time'] = times[mask]
+                yield result
+
+    def __may_match(self, stats, bounds, params):
+        time_stats = stats[params['time_field']]
+        if time_stats['numeric'] and time_stats['min'] is not None and not any(
+            self.__get_seconds(start) <= time_stats['max']
+            and time_stats['min'] < self.__get_seconds(end)
+            for (start, end) in bounds
+        ):
+            return False
+        for (field, values) in params['filters'].items():
+            field_stats = stats[field]
+            if field_stats['min'] is None:
+                return False
+            if field_stats['numeric']:
+                values = pd.to_numeric(
+                    pd.Series(values),
+                    errors='coerce',
+                ).dropna()
+            if not any(
+                field_stats['min'] <= value <= field_stats['max']
+                for value in values
+            ):
+                return False
+        return True
+
+    def __get_time_index(self, params):
+        (start_date, end_date) = self.__get_dates(params)
+        return pd.Index(
+            pd.period_range(
+                start_date,
+                end_date,
+                freq=self.__get_freq(params),
+            ).start_time,
+            name='Time',
+        )
+
+    def __get_freq(self, params):
+        # An `aggregation_unit` of 'Auto' is treated as 'Day'.
+        return {'Month': 'M', 'Quarter': 'Q', 'Year': 'Y'}.get(
+            params['aggregation_unit'],
+            'D',
+        )
+
+    def __get_times(self, column):
+        # Timestamps are interpreted in UTC.
+        if pd.api.types.is_numeric_dtype(column):
+            times = pd.to_datetime(column, unit='s')
+        else:
+            times = pd.to_datetime(column.astype(str))
+        return times.to_numpy(dtype='datetime64[ns]')
+
+    def __get_needed_fields(self, params):
+        fields = []
+        for field in (
+            list(params['fields'])
+            + list(params['dimensions'])
+            + list(params['filters'])
+            + [params['time_field']]
+        ):
+            if field not in fields:
+                fields.append(field)
+        return fields
+
+    def __get_downloads(self, params):
+        with self.__lock:
+            downloads = self.__read_manifest()['downloads']
+        for download in downloads:
+            if download['realm'].lower() == params['realm'].lower():
+                realm = download['realm']
+                return (
+                    [
+                        download for download in downloads
+                        if download['realm'] == realm
+                    ],
+                    realm,
+                )
+        raise KeyError(
+            "Realm '" + params['realm'] + "' not found in the raw data store.",
+        )
+
+    def __partition_downloads(self, downloads, new_download):
+        # Downloads whose data are all contained in the new download are no
+        # longer needed.
+        kept = []
+        removed = []
+        for download in downloads:
+            if (
+                download['realm'] == new_download['realm']
+                and set(download['fields']) <= set(new_download['fields'])
+                and self.__subtract(
+                    self.__get_dates(download),
+                    self.__get_dates(new_download),
+                ) == []
+            ):
+                removed.append(download)
+            else:
+                kept.append(download)
+        return (kept, removed)
+
+    def __defer_removal(self, manifest, removed_downloads):
+        # Record the files of the removed downloads in the manifest, and
+        # return the files that were recorded long enough ago to be deleted.
+        now = time.time()
+        removed = manifest.get('removed', []) + [
+            {'file': partition['file'], 'time': now}
+            for download in removed_downloads
+            for partition in download['partitions']
+        ]
+        manifest['removed'] = [
+            removed_file
+            for removed_file in removed
+            if removed_file['time'] > now - self.__removal_delay
+        ]
+        return [
+            removed_file['file']
+            for removed_file in removed
+            if removed_file['time'] <= now - self.__removal_delay
+        ]
+
+    def __load(self, file_name):
+        with self.__lock:
+            if file_name in self.__loaded:
+                self.__loaded.move_to_end(file_name)
+                return self.__loaded[file_name]
+        data = pd.read_feather(os.path.join(self.__directory, file_name))
+        with self.__lock:
+            self.__loaded[file_name] = data
+            while len(self.__loaded) > self.__max_loaded:
+                self.__loaded.popitem(last=False)
+        return data
+
+    def __read_manifest(self):
+        try:
+            with open(self.__manifest_path) as manifest_file:
+                return json.load(manifest_file)
+        except FileNotFoundError:
+            return {'downloads': []}
+
+    def __write_manifest(self, manifest):
+        def write(temporary_path):
+            with open(temporary_path, 'w') as temporary_file:
+                json.dump(manifest, temporary_file)
+        _files._write_atomically(self.__manifest_path, write)
+
+    def __remove(self, file_name):
+        with self.__lock:
+            self.__loaded.pop(file_name, None)
+        try:
+            os.remove(os.path.join(self.__directory, file_name))
+        except OSError:  # pragma: no cover
+            pass
+
+    def __convert_column(self, column):
+        # Columns whose values are all numbers are stored as floats, and
+        # other columns as categories, so that queries need not parse them.
+        numeric_column = pd.to_numeric(column, errors='coerce')
+        if numeric_column.isna().sum() == column.isna().sum():
+            return numeric_column.astype('float64')
+        return column.astype(object).astype('category')
+
+    def __convert_values(self, column, values):
+        if pd.api.types.is_numeric_dtype(column):
+            return pd.to_numeric(pd.Series(values), errors='coerce').dropna()
+        return values
+
+    def __get_stats(self, partition):
+        stats = {}
+        for field in partition.columns:
+            column = partition[field].dropna()
+            numeric = pd.api.types.is_numeric_dtype(column)
+            if len(column) == 0:
+                (minimum, maximum) = (None, None)
+            elif numeric:
+                (minimum, maximum) = (float(column.min()), float(column.max()))
+            else:
+                values = sorted(column.astype(str).unique())
+                (minimum, maximum) = (values[0], values[-1])
+            stats[field] = {'numeric': numeric, 'min': minimum, 'max': maximum}
+        return stats
+
+    def __get_dates(self, params):
+        return (
+            date.fromisoformat(str(params['start_date'])),
+            date.fromisoformat(str(params['end_date'])),
+        )
+
+    def __get_timestamp(self, date_):
+        return np.datetime64(date_, 'ns')
+
+    def __get_seconds(self, timestamp):
+        return float(
+            (timestamp - np.datetime64(0, 's')) / np.timedelta64(1, 's'),
+        )
+
+    def __intersect(self, interval, other):
+        start = max(interval[0], other[0])
+        end = min(interval[1], other[1])
+        return (start, end) if start <= end else None
+
+    def __subtract(self, interval, other):
+        if self.__intersect(interval, other) is None:
+            return [interval]
+        parts = []
+        if interval[0] < other[0]:
+            parts.append((interval[0], other[0] - timedelta(days=1)))
+        if interval[1] > other[1]:
+            parts.append((other[1] + timedelta(days=1), interval[1]))
+        return parts
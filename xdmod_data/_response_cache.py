@@ -0,0 +1,171 @@
+import hashlib
+import hmac
+import json
+import os
+import sqlite3
+import threading
+import time
+import warnings
+import zlib
+
+
+class _SqliteResponseCache:
+    # Responses are stored compressed in an SQLite database in WAL mode so
+    # that any number of processes on the same host can read and write it
+    # concurrently. Keys are HMACs of the request under the API token, so a
+    # response can only be found again by a caller holding the same token.
+    #
+    # The times at which responses are read are kept in memory and written
+    # in batches, so that reading a response does not take the write lock
+    # of the database.
+    def __init__(self, path, size_limit, max_age, max_num_accesses=100):
+        self.__path = os.fspath(path)
+        self.__size_limit = size_limit
+        self.__max_age = max_age
+        self.__max_num_accesses = max_num_accesses
+        self.__local = threading.local()
+        self.__is_open = False
+        self.__accesses = {}
+        self.__lock = threading.Lock()
+
+    def _open(self):
+        # The cache is not used if its database cannot be opened, e.g.,
+        # because the file belongs to another user.
+        try:
+            self.__create_database()
+            self.__is_open = True
+        except (OSError, sqlite3.Error) as e:
+            warnings.warn(
+                'Responses will not be cached, since the cache at'
+                + " `cache_path` '" + self.__path + "' cannot be opened: "
+                + str(e),
+            )
+
+    def _close(self):
+        if self.__is_open:
+            self.__write_accesses(self.__get_connection(), True)
+
+    def _get(self, token, url, post_fields):
+        if not self.__is_open:
+            return None
+        key = self.__get_key(token, url, post_fields)
+        connection = self.__get_connection()
+        row = connection.execute(
+            'SELECT value FROM responses WHERE key = ? AND created > ?',
+            (key, time.time() - self.__max_age),
+        ).fetchone()
+        if row is None:
+            return None
+        with self.__lock:
+            self.__accesses[key] = time.time()
+        self.__write_accesses(connection, False)
+        return zlib.decompress(row[0]).decode('utf-8')
+
+    def _set(self, token, url, post_fields, text):
+        if not self.__is_open:
+            return
+        key = self.__get_key(token, url, post_fields)
+        value = zlib.compress(text.encode('utf-8'))
+        if len(value) > self.__size_limit:
+            return
+        now = time.time()
+        connection = self.__get_connection()
+        # The pending accesses are written first so that the least recently
+        # used responses are evicted.
+        self.__write_accesses(connection, True)
+        with connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO responses'
+                + ' (key, value, size, created, accessed)'
+                + ' VALUES (?, ?, ?, ?, ?)',
+                (key, value, len(value), now, now),
+            )
+            self.__evict(connection)
+
+    def __evict(self, connection):
+        connection.execute(
+            'DELETE FROM responses WHERE created <= ?',
+            (time.time() - self.__max_age,),
+        )
+        (total_size,) = connection.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM responses',
+        ).fetchone()
+        if total_size <= self.__size_limit:
+            return
+        excess = total_size - self.__size_limit
+        keys = []
+        for (key, size) in connection.execute(
+            'SELECT key, size FROM responses ORDER BY accessed',
+        ):
+            keys.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        connection.executemany('DELETE FROM responses WHERE key = ?', keys)
+
+    def __write_accesses(self, connection, force):
+        with self.__lock:
+            if not self.__accesses or (
+                not force
+                and len(self.__accesses) < self.__max_num_accesses
+            ):
+                return
+            accesses = [
+                (accessed, key) for (key, accessed) in self.__accesses.items()
+            ]
+            self.__accesses = {}
+        with connection:
+            connection.executemany(
+                'UPDATE responses SET accessed = ? WHERE key = ?',
+                accesses,
+            )
+
+    def __get_key(self, token, url, post_fields):
+        request = json.dumps([url, post_fields], sort_keys=True, default=str)
+        return hmac.new(
+            token.encode('utf-8'),
+            request.encode('utf-8'),
+            hashlib.sha256,
+        ).hexdigest()
+
+    def __get_connection(self):
+        connection = getattr(self.__local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.__path, timeout=30)
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self.__local.connection = connection
+        return connection
+
+    def __create_database(self):
+        if not os.path.exists(self.__path):
+            # Only the owner of the cache file may read the cached responses.
+            os.close(os.open(self.__path, os.O_CREAT | os.O_WRONLY, 0o600))
+        else:
+            self.__check_ownership()
+        connection = self.__get_connection()
+        connection.execute('PRAGMA journal_mode=WAL')
+        with connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS responses ('
+                + 'key TEXT PRIMARY KEY, value BLOB NOT NULL,'
+                + ' size INTEGER NOT NULL, created REAL NOT NULL,'
+                + ' accessed REAL NOT NULL)',
+            )
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS responses_accessed'
+                + ' ON responses (accessed)',
+            )
+
+    def __check_ownership(self):
+        # An existing cache file is only used if it belongs to the current
+        # user and no one else can access it, since otherwise other users
+        # could read the cached responses or plant responses in it.
+        if not hasattr(os, 'getuid'):  # pragma: no cover
+            return
+        stat_result = os.stat(self.__path)
+        if stat_result.st_uid != os.getuid():
+            raise PermissionError('The file belongs to another user.')
+        if stat_result.st_mode & 0o077:
+            raise PermissionError(
+                'The file can be accessed by users other than its owner.',
+            )
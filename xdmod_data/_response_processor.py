@@ -1,9 +1,13 @@
 import csv
 from datetime import datetime
+import heapq
 import html
+import io
+import json
 import numpy as np
 import pandas as pd
 import re
+import xdmod_data._raw_data_builder as _raw_data_builder
 
 
 def _process_get_data_response(dw, params, response):
@@ -22,7 +26,300 @@ def _process_get_data_response(dw, params, response):
         return __parse_aggregate_csv_data(params, csv_data)
 
 
+def _process_get_data_responses(dw, params, responses):
+    if params['dataset_type'] == 'timeseries':
+        return _process_timeseries_data(
+            dw,
+            params,
+            [
+                _read_timeseries_response(response, params['output_format'])
+                for response in responses
+            ],
+        )
+    metric_labels = [
+        dw._get_metric_label(params['realm'], metric_id)
+        for metric_id in params['metric']
+    ]
+    params['dimension'] = dw._get_dimension_label(
+        params['realm'],
+        params['dimension'],
+    )
+    parsed_responses = [
+        __read_aggregate_csv_data(csv.reader(response.splitlines()))
+        for response in responses
+    ]
+    return __get_multiple_metric_aggregate_data(
+        params,
+        metric_labels,
+        parsed_responses,
+    )
+
+
+def _convert_to_backend(backend, data):
+    # `data` is either a pandas object or an Arrow table.
+    if backend == 'pandas':
+        return data
+    pa = _raw_data_builder._import_pyarrow("backend='" + backend + "'")
+    if not isinstance(data, pa.Table):
+        data = pa.Table.from_pandas(_flatten_data(data), preserve_index=False)
+    if backend == 'polars':
+        return _raw_data_builder._import_polars("backend='polars'").from_arrow(
+            data,
+        )
+    return data
+
+
+def _flatten_data(data):
+    # Return a data frame with a range index and string column names, e.g.,
+    # for writing to a file.
+    if isinstance(data, pd.Series):
+        data = data.to_frame()
+    if not isinstance(data.index, pd.RangeIndex):
+        data = data.reset_index()
+    if isinstance(data.columns, pd.MultiIndex):
+        data.columns = [
+            ' / '.join(str(level) for level in column if level != '')
+            for column in data.columns
+        ]
+    data.columns = [str(column) for column in data.columns]
+    return data
+
+
+def _merge_get_data_responses(dataset_type, responses):
+    # Merge the CSV responses to requests that differ only in the values of
+    # the filter on the dimension by which the data are grouped, i.e., whose
+    # responses contain different dimension values. For timeseries, the
+    # responses are followed by the responses to the same requests for
+    # aggregate data. The server orders the dimension values by their
+    # aggregate values, in descending order, and then by their labels, so
+    # the values in the responses are merged in that order.
+    tables = [
+        list(csv.reader(response.splitlines())) for response in responses
+    ]
+    if dataset_type == 'timeseries':
+        num_tables = len(tables) // 2
+        rows = __merge_timeseries_tables(
+            tables[:num_tables],
+            [
+                __get_values_by_label(table) for table in tables[num_tables:]
+            ],
+        )
+    else:
+        rows = __merge_aggregate_tables(tables)
+    output = io.StringIO()
+    csv.writer(output).writerows(rows)
+    return output.getvalue()
+
+
+def _read_timeseries_response(response, output_format='dense'):
+    # Return the time values, the data, and the dimension values of the
+    # response, where the data are the rows of the response if
+    # `output_format` is 'dense' and only the cells with values otherwise.
+    csv_data = csv.reader(response.splitlines())
+    if output_format != 'dense':
+        return __read_timeseries_csv_cells(csv_data)
+    return __read_timeseries_csv_data(csv_data)
+
+
+def _get_timeseries_cells(parsed_response):
+    # Convert the rows of a response read with `output_format='dense'` to its
+    # cells with values.
+    (time_values, data, dimension_values) = parsed_response
+    cells = ([], [], [])
+    for (row, line) in enumerate(data):
+        __append_timeseries_cells(cells, row, line)
+    return (
+        time_values,
+        __concatenate_timeseries_cells(cells),
+        dimension_values,
+    )
+
+
+def _process_timeseries_data(dw, params, parsed_responses):
+    if isinstance(params['metric'], str):
+        params['metric'] = dw._get_metric_label(
+            params['realm'],
+            params['metric'],
+        )
+        params['dimension'] = dw._get_dimension_label(
+            params['realm'],
+            params['dimension'],
+        )
+        if params['output_format'] != 'dense':
+            return __get_sparse_timeseries_data(
+                params,
+                [params['metric']],
+                parsed_responses,
+            )
+        (time_values, data, dimension_values) = parsed_responses[0]
+        return __get_timeseries_data_frame(
+            dw,
+            params,
+            data,
+            time_values,
+            dimension_values,
+        )
+    metric_labels = [
+        dw._get_metric_label(params['realm'], metric_id)
+        for metric_id in params['metric']
+    ]
+    params['dimension'] = dw._get_dimension_label(
+        params['realm'],
+        params['dimension'],
+    )
+    if params['output_format'] != 'dense':
+        return __get_sparse_timeseries_data(
+            params,
+            metric_labels,
+            parsed_responses,
+        )
+    return __get_multiple_metric_timeseries_data_frame(
+        params,
+        metric_labels,
+        parsed_responses,
+    )
+
+
+def _convert_timeseries_data_frame(output_format, metric_label, data):
+    if output_format == 'sparse':
+        return data.astype('float64').astype(
+            pd.SparseDtype('float64', np.nan),
+        )
+    if output_format == 'long':
+        columns_name = data.columns.name
+        data = data.astype('float64')
+        data.columns = pd.Index(data.columns, dtype=object)
+        return data.melt(
+            var_name=columns_name,
+            value_name=metric_label,
+            ignore_index=False,
+        ).dropna().reset_index().astype({
+            columns_name: 'category',
+            metric_label: 'Float64',
+        })
+    return data
+
+
+def _decode_raw_data_chunk(chunk, num_fields):
+    # The chunk is a sequence of newline-terminated JSON text sequence
+    # records, so it can be decoded with a single call once the records are
+    # joined into an array.
+    records = chunk.replace(b'\x1e', b'').split(b'\n')
+    rows = json.loads(
+        b'[' + b','.join(record for record in records if record.strip())
+        + b']',
+    )
+    return _get_raw_data_columns(rows, num_fields)
+
+
+def _get_raw_data_columns(rows, num_fields):
+    if not rows:
+        return ([[] for _ in range(num_fields)], 0)
+    return ([list(column) for column in zip(*rows)], len(rows))
+
+
+def __merge_aggregate_tables(tables):
+    # Responses without any dimension values may lack the header row.
+    header = ([table for table in tables if len(table) > 7] or tables)[0][:8]
+    return header + list(heapq.merge(
+        *[
+            [row for row in table[8:] if len(row) > 1]
+            for table in tables
+        ],
+        key=lambda row: (
+            __get_ranking_key(row[1]),
+            html.unescape(row[0]),
+        ),
+    ))
+
+
+def __merge_timeseries_tables(tables, values_by_label_list):
+    # The columns of the responses are placed side by side, and the cells of
+    # time periods that are missing from a response are left missing.
+    positions = [
+        position for (position, table) in enumerate(tables) if len(table) > 7
+    ]
+    if not positions:
+        return tables[0]
+    rows_by_time = {}
+    for position in positions:
+        for row in tables[position][8:]:
+            if len(row) > 1:
+                rows_by_time.setdefault(
+                    row[0],
+                    [
+                        ['nan'] * (len(table[7]) - 1 if len(table) > 7 else 0)
+                        for table in tables
+                    ],
+                )[position] = row[1:]
+    columns = list(heapq.merge(
+        *[
+            [
+                (
+                    __get_ranking_key(values_by_label_list[position].get(
+                        label,
+                        'nan',
+                    )),
+                    label,
+                    position,
+                    index,
+                )
+                for (index, label) in enumerate(
+                    __parse_timeseries_dimension_values(
+                        tables[position][7][1:],
+                    ),
+                )
+            ]
+            for position in positions
+        ],
+        key=lambda column: column[:2],
+    ))
+    rows = tables[positions[0]][:7]
+    rows.append([tables[positions[0]][7][0]] + [
+        tables[position][7][index + 1] for (_, _, position, index) in columns
+    ])
+    for time_value in sorted(rows_by_time):
+        rows.append([time_value] + [
+            rows_by_time[time_value][position][index]
+            for (_, _, position, index) in columns
+        ])
+    return rows
+
+
+def __get_values_by_label(aggregate_table):
+    (data, dimension_values) = __read_aggregate_csv_data(aggregate_table)
+    return dict(zip(dimension_values, data))
+
+
+def __get_ranking_key(value):
+    # Sort values in descending order, with missing values last.
+    try:
+        value = float(value)
+    except ValueError:
+        value = np.nan
+    return np.inf if np.isnan(value) else -value
+
+
 def __parse_timeseries_csv_data(dw, params, csv_data):
+    if params['output_format'] != 'dense':
+        return __get_sparse_timeseries_data(
+            params,
+            [params['metric']],
+            [__read_timeseries_csv_cells(csv_data)],
+        )
+    (time_values, data, dimension_values) = __read_timeseries_csv_data(
+        csv_data,
+    )
+    return __get_timeseries_data_frame(
+        dw,
+        params,
+        data,
+        time_values,
+        dimension_values,
+    )
+
+
+def __read_timeseries_csv_data(csv_data):
     time_values = []
     data = []
     for line_num, line in enumerate(csv_data):
@@ -31,23 +328,40 @@ def __parse_timeseries_csv_data(dw, params, csv_data):
         elif line_num > 7 and len(line) > 1:
             time_values.append(__parse_timeseries_date_string(line[0]))
             data.append(np.asarray(line[1:]))
-    return __get_timeseries_data_frame(
-        dw,
-        params,
-        data,
+    return (time_values, data, dimension_values)
+
+
+def __read_timeseries_csv_cells(csv_data):
+    # Only the cells with values are kept, one line of the response at a
+    # time, so that the rows of the response are never all in memory.
+    time_values = []
+    cells = ([], [], [])
+    for line_num, line in enumerate(csv_data):
+        if line_num == 7:
+            dimension_values = __parse_timeseries_dimension_values(line[1:])
+        elif line_num > 7 and len(line) > 1:
+            __append_timeseries_cells(cells, len(time_values), line[1:])
+            time_values.append(__parse_timeseries_date_string(line[0]))
+    return (
         time_values,
+        __concatenate_timeseries_cells(cells),
         dimension_values,
     )
 
 
 def __parse_aggregate_csv_data(params, csv_data):
+    (data, dimension_values) = __read_aggregate_csv_data(csv_data)
+    return __get_aggregate_series(params, data, dimension_values)
+
+
+def __read_aggregate_csv_data(csv_data):
     dimension_values = []
     data = []
     for line_num, line in enumerate(csv_data):
         if line_num > 7 and len(line) > 1:
             dimension_values.append(html.unescape(line[0]))
             data.append(line[1])
-    return __get_aggregate_series(params, data, dimension_values)
+    return (data, dimension_values)
 
 
 def __parse_timeseries_dimension_values(labels):
@@ -102,6 +416,259 @@ def __get_timeseries_data_frame(
     ).fillna(value=np.nan)
 
 
+def __get_multiple_metric_timeseries_data_frame(
+    params,
+    metric_labels,
+    parsed_responses,
+):
+    # Every metric shares one time index, and the values of all the metrics
+    # are written directly into a single block so that no per-metric data
+    # frames need to be built and concatenated.
+    time_values = sorted(set().union(
+        *[time_values for (time_values, _, _) in parsed_responses],
+    ))
+    time_positions = {
+        time_value: position for position, time_value in enumerate(time_values)
+    }
+    num_columns = sum(
+        len(dimension_values) for (_, _, dimension_values) in parsed_responses
+    )
+    block = np.full((len(time_values), num_columns), np.nan)
+    metric_level = []
+    dimension_level = []
+    column = 0
+    for (metric_label, (metric_time_values, data, dimension_values)) in zip(
+        metric_labels,
+        parsed_responses,
+    ):
+        next_column = column + len(dimension_values)
+        if len(data):
+            rows = [time_positions[value] for value in metric_time_values]
+            block[rows, column:next_column] = np.asarray(data, dtype=float)
+        metric_level += [metric_label] * len(dimension_values)
+        dimension_level += dimension_values
+        column = next_column
+    return pd.DataFrame(
+        data=block,
+        index=pd.Series(
+            data=time_values,
+            dtype='datetime64[ns]',
+            name='Time',
+        ),
+        columns=__get_multiple_metric_columns(
+            params,
+            metric_level,
+            dimension_level,
+        ),
+        dtype='Float64',
+        copy=False,
+    ).fillna(value=np.nan)
+
+
+def __get_sparse_timeseries_data(params, metric_labels, parsed_responses):
+    # The responses are read as their cells with values, whose rows are
+    # mapped to the positions of their times in the union of all the times,
+    # so that the dense matrix of time by dimension values is never built.
+    time_values = sorted(set().union(
+        *[time_values for (time_values, _, _) in parsed_responses],
+    ))
+    time_positions = {
+        time_value: position for position, time_value in enumerate(time_values)
+    }
+    cells = [
+        (
+            np.asarray(
+                [time_positions[value] for value in metric_time_values],
+                dtype=int,
+            )[rows],
+            columns,
+            values,
+        )
+        for (metric_time_values, (rows, columns, values), _)
+        in parsed_responses
+    ]
+    dimension_values = [
+        metric_dimension_values
+        for (_, _, metric_dimension_values) in parsed_responses
+    ]
+    if params['output_format'] == 'long':
+        return __get_long_timeseries_data_frame(
+            params,
+            metric_labels,
+            time_values,
+            cells,
+            dimension_values,
+        )
+    return __get_sparse_timeseries_data_frame(
+        params,
+        metric_labels,
+        time_values,
+        cells,
+        dimension_values,
+    )
+
+
+def __append_timeseries_cells(cells, row, line):
+    line = np.asarray(pd.to_numeric(line, errors='coerce'), dtype=float)
+    (line_columns,) = np.nonzero(~np.isnan(line))
+    cells[0].append(np.full(len(line_columns), row))
+    cells[1].append(line_columns)
+    cells[2].append(line[line_columns])
+
+
+def __concatenate_timeseries_cells(cells):
+    (rows, columns, values) = cells
+    if not rows:
+        return (np.array([], dtype=int), np.array([], dtype=int), np.array([]))
+    return (
+        np.concatenate(rows),
+        np.concatenate(columns),
+        np.concatenate(values),
+    )
+
+
+def __get_long_timeseries_data_frame(
+    params,
+    metric_labels,
+    time_values,
+    cells,
+    dimension_values,
+):
+    multiple_metrics = not isinstance(params['metric'], str)
+    result = {
+        'Time': np.asarray(time_values, dtype='datetime64[ns]')[
+            np.concatenate([rows for (rows, _, _) in cells])
+        ],
+    }
+    if multiple_metrics:
+        result['Metric'] = pd.Categorical(
+            np.repeat(metric_labels, [len(rows) for (rows, _, _) in cells]),
+            categories=metric_labels,
+        )
+    if params['dimension'] is not None:
+        result[params['dimension']] = pd.Categorical(np.concatenate([
+            np.asarray(metric_dimension_values, dtype=object)[columns]
+            for ((_, columns, _), metric_dimension_values) in zip(
+                cells,
+                dimension_values,
+            )
+        ]))
+    value_name = 'Value' if multiple_metrics else params['metric']
+    result[value_name] = pd.array(
+        np.concatenate([values for (_, _, values) in cells]),
+        dtype='Float64',
+    )
+    return pd.DataFrame(result)
+
+
+def __get_sparse_timeseries_data_frame(
+    params,
+    metric_labels,
+    time_values,
+    cells,
+    dimension_values,
+):
+    columns = []
+    metric_level = []
+    dimension_level = []
+    for (metric_label, (rows, line_columns, values), metric_values) in zip(
+        metric_labels,
+        cells,
+        dimension_values,
+    ):
+        order = np.lexsort((rows, line_columns))
+        boundaries = np.cumsum(
+            np.bincount(line_columns, minlength=len(metric_values)),
+        )
+        for (column_rows, column_values) in zip(
+            np.split(rows[order], boundaries[:-1]),
+            np.split(values[order], boundaries[:-1]),
+        ):
+            column = np.full(len(time_values), np.nan)
+            column[column_rows] = column_values
+            columns.append(pd.arrays.SparseArray(column, fill_value=np.nan))
+        metric_level += [metric_label] * len(metric_values)
+        dimension_level += metric_values
+    result = pd.DataFrame(
+        data=dict(enumerate(columns)),
+        index=pd.Series(
+            data=time_values,
+            dtype='datetime64[ns]',
+            name='Time',
+        ),
+    )
+    if isinstance(params['metric'], str):
+        result.columns = __get_timeseries_data_frame_columns(
+            None,
+            params,
+            dimension_level,
+        )
+    else:
+        result.columns = __get_multiple_metric_columns(
+            params,
+            metric_level,
+            dimension_level,
+        )
+    return result
+
+
+def __get_multiple_metric_columns(params, metric_level, dimension_level):
+    if params['dimension'] is None:
+        return pd.Index(metric_level, dtype='string', name='Metric')
+    return pd.MultiIndex.from_arrays(
+        [
+            pd.Index(metric_level, dtype='string'),
+            pd.Index(dimension_level, dtype='string'),
+        ],
+        names=['Metric', params['dimension']],
+    )
+
+
+def __get_multiple_metric_aggregate_data(
+    params,
+    metric_labels,
+    parsed_responses,
+):
+    if params['dimension'] is None:
+        return pd.Series(
+            data=[
+                data[0] if data else np.nan
+                for (data, _) in parsed_responses
+            ],
+            index=pd.Series(data=metric_labels, dtype='string'),
+            dtype='Float64',
+        ).fillna(value=np.nan)
+    dimension_values = list(dict.fromkeys(
+        value
+        for (_, metric_dimension_values) in parsed_responses
+        for value in metric_dimension_values
+    ))
+    dimension_positions = {
+        value: position for position, value in enumerate(dimension_values)
+    }
+    block = np.full((len(dimension_values), len(metric_labels)), np.nan)
+    for column, (data, metric_dimension_values) in enumerate(
+        parsed_responses,
+    ):
+        if data:
+            rows = [
+                dimension_positions[value]
+                for value in metric_dimension_values
+            ]
+            block[rows, column] = np.asarray(data, dtype=float)
+    return pd.DataFrame(
+        data=block,
+        index=pd.Series(
+            data=dimension_values,
+            dtype='string',
+            name=params['dimension'],
+        ),
+        columns=pd.Index(metric_labels, dtype='string', name='Metric'),
+        dtype='Float64',
+        copy=False,
+    ).fillna(value=np.nan)
+
+
 def __get_aggregate_series(params, data, dimension_values):
     if params['dimension'] is None:
         index_data = params['metric']
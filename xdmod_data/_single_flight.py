@@ -0,0 +1,45 @@
+from concurrent.futures import Future, wait
+import threading
+import xdmod_data._deadline as _deadline
+
+
+class _SingleFlight:
+    # Concurrent calls with the same key share a single execution of the
+    # function passed by the first caller and receive its result (or
+    # exception) instead of each executing it. A caller whose deadline
+    # differs from that of the first caller executes the function again if
+    # the first caller's deadline was exceeded.
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__futures = {}
+
+    def _do(self, key, function):
+        with self.__lock:
+            (future, deadline) = self.__futures.get(key, (None, None))
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                self.__futures[key] = (future, _deadline._get())
+        if not is_leader:
+            return self.__follow(key, function, future, deadline)
+        try:
+            result = function()
+        except BaseException as error:
+            future.set_exception(error)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self.__lock:
+                del self.__futures[key]
+
+    def __follow(self, key, function, future, deadline):
+        remaining_time = _deadline._get_remaining_time()
+        if not wait([future], timeout=remaining_time).done:  # pragma: no cover
+            raise _deadline._get_error()
+        if isinstance(future.exception(), TimeoutError) and (
+            deadline is not _deadline._get()
+        ):  # pragma: no cover
+            return self._do(key, function)
+        return future.result()
@@ -0,0 +1,223 @@
+from datetime import date, datetime, timedelta
+import numpy as np
+import pandas as pd
+import threading
+
+# The metrics whose values for a month, quarter, or year are the sums of
+# their values for each day in it. Metrics such as averages, ratios, and
+# counts of running jobs or active users are not.
+_ADDITIVE_METRICS = {
+    'Jobs': (
+        'job_count',
+        'started_job_count',
+        'submitted_job_count',
+        'total_cpu_hours',
+        'total_gpu_hours',
+        'total_node_hours',
+        'total_waitduration_hours',
+        'total_wallduration_hours',
+    ),
+}
+
+
+class _TimeseriesCache:
+    # Data for a time bucket can still change while the warehouse ingests
+    # jobs that ended in it, so a bucket is only trusted indefinitely once it
+    # was fetched at least `settle_days` after it ended; otherwise it is
+    # trusted until it is older than `max_age`.
+    def __init__(self, settle_days=2, max_age=timedelta(hours=1)):
+        self.__settle_days = settle_days
+        self.__max_age = max_age
+        self.__entries = {}
+        self.__lock = threading.Lock()
+
+    def _applies_to(self, params):
+        if (
+            params['dataset_type'] != 'timeseries'
+            or params['aggregation_unit'] == 'Auto'
+        ):
+            return False
+        try:
+            (start_date, end_date) = self.__get_dates(params)
+        except (TypeError, ValueError):
+            return False
+        return start_date <= end_date
+
+    def _get_missing_intervals(self, params):
+        (start_date, end_date) = self.__get_dates(params)
+        unit = params['aggregation_unit']
+        with self.__lock:
+            entry = self.__entries.get(self.__get_key(params))
+            buckets = {} if entry is None else entry['buckets']
+        now = datetime.now()
+        intervals = []
+        for (bucket_start, bucket_end) in self.__get_buckets(
+            start_date,
+            end_date,
+            unit,
+        ):
+            fetched_at = buckets.get(bucket_start)
+            if fetched_at is not None and self.__is_fresh(
+                fetched_at,
+                bucket_end,
+                now,
+            ):
+                continue
+            if intervals and intervals[-1][1] + timedelta(days=1) == (
+                bucket_start
+            ):
+                intervals[-1] = (intervals[-1][0], bucket_end)
+            else:
+                intervals.append((bucket_start, bucket_end))
+        return intervals
+
+    def _store(self, params, interval, parsed_response):
+        (time_values, data, dimension_values) = parsed_response
+        new_data = pd.DataFrame(
+            data=np.asarray(data, dtype=float).reshape(
+                len(time_values),
+                len(dimension_values),
+            ),
+            index=pd.DatetimeIndex(time_values, dtype='datetime64[ns]'),
+            columns=dimension_values,
+        )
+        (interval_start, interval_end) = interval
+        fetched_at = datetime.now()
+        key = self.__get_key(params)
+        with self.__lock:
+            entry = self.__entries.setdefault(
+                key,
+                {'buckets': {}, 'data': None},
+            )
+            if entry['data'] is None:
+                entry['data'] = new_data
+            else:
+                old_data = entry['data']
+                old_data = old_data[
+                    (old_data.index < pd.Timestamp(interval_start))
+                    | (old_data.index > pd.Timestamp(interval_end))
+                ]
+                entry['data'] = pd.concat([old_data, new_data]).sort_index()
+            for (bucket_start, _) in self.__get_buckets(
+                interval_start,
+                interval_end,
+                params['aggregation_unit'],
+            ):
+                entry['buckets'][bucket_start] = fetched_at
+
+    def _get(self, params):
+        (start_date, end_date) = self.__get_dates(params)
+        start_date = self.__get_bucket_start(
+            start_date,
+            params['aggregation_unit'],
+        )
+        with self.__lock:
+            data = self.__entries[self.__get_key(params)]['data']
+        data = data[
+            (data.index >= pd.Timestamp(start_date))
+            & (data.index <= pd.Timestamp(end_date))
+        ]
+        if params['dimension'] != 'none':
+            data = data.dropna(axis='columns', how='all')
+        return (
+            list(data.index.to_pydatetime()),
+            data.to_numpy(),
+            list(data.columns),
+        )
+
+    def _get_day_params(self, params):
+        # Return the parameters of the Day timeseries from which the data for
+        # `params` can be computed, covering the whole months, quarters, or
+        # years that the server would return, or None if they cannot be.
+        if params['aggregation_unit'] == 'Day' or params['metric'] not in (
+            _ADDITIVE_METRICS.get(params['realm'], ())
+        ):
+            return None
+        buckets = list(self.__get_buckets(
+            *self.__get_dates(params),
+            params['aggregation_unit'],
+        ))
+        return {
+            **params,
+            'start_date': buckets[0][0].isoformat(),
+            'end_date': buckets[-1][1].isoformat(),
+            'aggregation_unit': 'Day',
+        }
+
+    def _resample(self, params, day_data):
+        (time_values, data, dimension_values) = day_data
+        day_data = pd.DataFrame(
+            data=np.asarray(data, dtype=float).reshape(
+                len(time_values),
+                len(dimension_values),
+            ),
+            index=pd.DatetimeIndex(time_values, dtype='datetime64[ns]'),
+            columns=dimension_values,
+        )
+        data = day_data.groupby(
+            day_data.index.to_period(
+                {'Month': 'M', 'Quarter': 'Q', 'Year': 'Y'}[
+                    params['aggregation_unit']
+                ],
+            ).start_time,
+        ).sum(min_count=1)
+        return (
+            list(data.index.to_pydatetime()),
+            data.to_numpy(),
+            list(data.columns),
+        )
+
+    def __get_key(self, params):
+        return (
+            params['realm'],
+            params['metric'],
+            params['dimension'],
+            tuple(
+                (dimension, tuple(sorted(params['filters'][dimension])))
+                for dimension in sorted(params['filters'])
+            ),
+            params['aggregation_unit'],
+        )
+
+    def __get_dates(self, params):
+        return (
+            date.fromisoformat(str(params['start_date'])),
+            date.fromisoformat(str(params['end_date'])),
+        )
+
+    def __is_fresh(self, fetched_at, bucket_end, now):
+        return (
+            (fetched_at.date() - bucket_end).days > self.__settle_days
+            or now - fetched_at < self.__max_age
+        )
+
+    def __get_buckets(self, start_date, end_date, unit):
+        bucket_start = self.__get_bucket_start(start_date, unit)
+        while bucket_start <= end_date:
+            next_bucket_start = self.__get_next_bucket_start(
+                bucket_start,
+                unit,
+            )
+            yield (bucket_start, next_bucket_start - timedelta(days=1))
+            bucket_start = next_bucket_start
+
+    def __get_bucket_start(self, date_, unit):
+        if unit == 'Day':
+            return date_
+        elif unit == 'Month':
+            return date(date_.year, date_.month, 1)
+        elif unit == 'Quarter':
+            return date(date_.year, ((date_.month - 1) // 3) * 3 + 1, 1)
+        else:
+            return date(date_.year, 1, 1)
+
+    def __get_next_bucket_start(self, bucket_start, unit):
+        if unit == 'Day':
+            return bucket_start + timedelta(days=1)
+        num_months = {'Month': 1, 'Quarter': 3, 'Year': 12}[unit]
+        month_index = bucket_start.month - 1 + num_months
+        return date(
+            bucket_start.year + month_index // 12,
+            month_index % 12 + 1,
+            1,
+        )
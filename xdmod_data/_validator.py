@@ -1,10 +1,17 @@
 from datetime import date, timedelta
+import os
+import xdmod_data._raw_data_builder as _raw_data_builder
+from xdmod_data.transport import Transport
 
 
 def _assert_str(name, value):
     return __assert_type(name, value, str, 'string')
 
 
+def _assert_bool(name, value):
+    return __assert_type(name, value, bool, 'Boolean')
+
+
 def _assert_runtime_context(in_runtime_context):
     if not in_runtime_context:
         raise RuntimeError(
@@ -19,8 +26,22 @@ def _validate_get_data_params(data_warehouse, descriptors, params):
     (results['start_date'], results['end_date']) = (
         __validate_duration(params['duration'])
     )
+    results.update(
+        _validate_prepare_params(data_warehouse, descriptors, params),
+    )
+    results.update(__validate_dataset_type_and_aggregation_unit(params))
+    results['output_format'] = __validate_output_format(params)
+    results['backend'] = __validate_backend(
+        params['backend'],
+        results['output_format'],
+    )
+    return results
+
+
+def _validate_prepare_params(data_warehouse, descriptors, params):
+    results = {}
     results['realm'] = _find_realm_id(descriptors, params['realm'])
-    results['metric'] = __find_metric_id(
+    results['metric'] = __find_metric_ids(
         descriptors,
         results['realm'],
         params['metric'],
@@ -36,19 +57,43 @@ def _validate_get_data_params(data_warehouse, descriptors, params):
         results['realm'],
         params['filters'],
     )
-    results['dataset_type'] = __find_str_in_sequence(
-        params['dataset_type'],
-        ('timeseries', 'aggregate'),
-        'dataset_type',
+    results['top_n'] = __validate_top_n(results, params['top_n'])
+    results['include_other'] = _assert_bool(
+        'include_other',
+        params['include_other'],
+    )
+    return results
+
+
+def _validate_execute_params(params):
+    results = {}
+    (results['start_date'], results['end_date']) = (
+        __validate_duration(params['duration'])
     )
-    results['aggregation_unit'] = __find_str_in_sequence(
-        params['aggregation_unit'],
-        _get_aggregation_units(),
-        'aggregation_unit',
+    results.update(__validate_dataset_type_and_aggregation_unit(params))
+    results['output_format'] = __validate_output_format(params)
+    results['backend'] = __validate_backend(
+        params['backend'],
+        results['output_format'],
     )
     return results
 
 
+def _validate_execute_many_params(params):
+    if isinstance(params['durations'], str):
+        raise TypeError('`durations` must be a sequence of durations.')
+    try:
+        durations = list(params['durations'])
+    except TypeError:
+        raise TypeError(
+            '`durations` must be a sequence of durations.',
+        ) from None
+    return [
+        _validate_execute_params({**params, 'duration': duration})
+        for duration in durations
+    ]
+
+
 def _validate_get_raw_data_params(data_warehouse, descriptors, params):
     results = {}
     (results['start_date'], results['end_date']) = (
@@ -66,13 +111,121 @@ def _validate_get_raw_data_params(data_warehouse, descriptors, params):
         params['realm'],
         params['filters'],
     )
-    results['show_progress'] = __assert_bool(
+    results['show_progress'] = _assert_bool(
         'show_progress',
         params['show_progress'],
     )
+    results['num_processes'] = __assert_positive(
+        'num_processes',
+        params['num_processes'],
+        int,
+    )
+    results['memory_limit'] = params['memory_limit']
+    if params['memory_limit'] is not None:
+        __assert_positive('memory_limit', params['memory_limit'], int)
+        _raw_data_builder._import_pyarrow('memory_limit')
+    results['checkpoint_dir'] = __validate_path(
+        'checkpoint_dir',
+        params['checkpoint_dir'],
+    )
+    results['backend'] = __validate_backend(params['backend'])
+    return results
+
+
+def _validate_aggregate_raw_data_params(params):
+    results = {}
+    (results['start_date'], results['end_date']) = (
+        __validate_duration(params['duration'])
+    )
+    results['realm'] = _assert_str('realm', params['realm'])
+    results['fields'] = __validate_str_sequence('fields', params['fields'])
+    if not results['fields']:
+        raise ValueError('`fields` must contain at least one field.')
+    results['aggregation'] = __find_str_in_sequence(
+        params['aggregation'],
+        ('sum', 'mean', 'min', 'max', 'count'),
+        'aggregation',
+    )
+    results['dimensions'] = __validate_str_sequence(
+        'dimensions',
+        params['dimensions'],
+    )
+    try:
+        results['filters'] = {
+            _assert_str('filters', field): __validate_str_sequence(
+                'filters',
+                params['filters'][field],
+            )
+            for field in params['filters']
+        }
+    except TypeError:
+        raise TypeError(
+            '`filters` must be a mapping whose keys are strings and whose'
+            + ' values are strings or sequences of strings.',
+        ) from None
+    results.update(__validate_dataset_type_and_aggregation_unit(params))
+    results['time_field'] = _assert_str('time_field', params['time_field'])
     return results
 
 
+def _validate_raw_data_store_dir(raw_data_store_dir):
+    return __validate_path('raw_data_store_dir', raw_data_store_dir)
+
+
+def _validate_transport(transport):
+    if isinstance(transport, Transport):
+        return transport
+    if not isinstance(transport, str):
+        raise TypeError('`transport` must be a string or a `Transport`.')
+    return __find_str_in_sequence(
+        transport,
+        ('requests', 'http2'),
+        'transport',
+    )
+
+
+def _validate_resample_timeseries(resample_timeseries, cache_timeseries):
+    if _assert_bool('resample_timeseries', resample_timeseries) and not (
+        cache_timeseries
+    ):
+        raise ValueError(
+            '`resample_timeseries` can only be used with `cache_timeseries`.',
+        )
+    return resample_timeseries
+
+
+def _validate_timeout(timeout):
+    if timeout is None:
+        return None
+    if isinstance(timeout, (tuple, list)):
+        if len(timeout) != 2:
+            raise ValueError('`timeout` must be a number or a tuple of 2.')
+        return tuple(
+            __assert_positive('timeout', seconds, (int, float))
+            for seconds in timeout
+        )
+    __assert_positive('timeout', timeout, (int, float))
+    return (timeout, timeout)
+
+
+def _validate_deadline(deadline):
+    if deadline is None:
+        return None
+    return __assert_positive('deadline', deadline, (int, float))
+
+
+def _validate_max_filter_values(max_filter_values):
+    return __assert_positive('max_filter_values', max_filter_values, int)
+
+
+def _validate_cache_params(cache_path, cache_size_limit, cache_max_age):
+    return (
+        __validate_path('cache_path', cache_path),
+        __assert_positive('cache_size_limit', cache_size_limit, int),
+        __assert_positive('cache_max_age', cache_max_age, (int, float)),
+    )
+
+
 def _find_realm_id(descriptors, realm):
     return __find_id_in_descriptor(
         descriptors._get_aggregate(),
@@ -142,6 +295,94 @@ def __assert_type(name, value, type_, type_name):
     return value
 
 
+def __validate_str_sequence(name, value):
+    if isinstance(value, str):
+        return (value,)
+    try:
+        return tuple(_assert_str(name, item) for item in value)
+    except TypeError:
+        raise TypeError(
+            '`' + name + '` must be a string or a sequence of strings.',
+        ) from None
+
+
+def __validate_path(name, value):
+    if value is None:
+        return None
+    try:
+        return os.fspath(value)
+    except TypeError:
+        raise TypeError(
+            '`' + name + '` must be a string or a path-like object.',
+        ) from None
+
+
+def __assert_positive(name, value, type_):
+    if isinstance(value, bool) or not isinstance(value, type_):
+        raise TypeError(
+            '`' + name + '` must be '
+            + ('an integer' if type_ is int else 'a number') + '.',
+        )
+    if value <= 0:
+        raise ValueError('`' + name + '` must be positive.')
+    return value
+
+
+def __validate_top_n(results, top_n):
+    if top_n is None:
+        return None
+    __assert_positive('top_n', top_n, int)
+    if not isinstance(results['metric'], str):
+        raise ValueError('`top_n` can only be used with a single metric.')
+    if results['dimension'] == 'none':
+        raise ValueError(
+            "`top_n` can only be used with a `dimension` other than 'None'.",
+        )
+    return top_n
+
+
+def __validate_dataset_type_and_aggregation_unit(params):
+    return {
+        'dataset_type': __find_str_in_sequence(
+            params['dataset_type'],
+            ('timeseries', 'aggregate'),
+            'dataset_type',
+        ),
+        'aggregation_unit': __find_str_in_sequence(
+            params['aggregation_unit'],
+            _get_aggregation_units(),
+            'aggregation_unit',
+        ),
+    }
+
+
+def __validate_output_format(params):
+    return __find_str_in_sequence(
+        params['output_format'],
+        ('dense', 'sparse', 'long'),
+        'output_format',
+    )
+
+
+def __validate_backend(backend, output_format=None):
+    backend = __find_str_in_sequence(
+        backend,
+        ('pandas', 'arrow', 'polars'),
+        'backend',
+    )
+    if backend == 'pandas':
+        return backend
+    if output_format == 'sparse':
+        raise ValueError(
+            "`output_format` 'sparse' can only be used with `backend`"
+            + " 'pandas'.",
+        )
+    _raw_data_builder._import_pyarrow("backend='" + backend + "'")
+    if backend == 'polars':
+        _raw_data_builder._import_polars("backend='polars'")
+    return backend
+
+
 def __validate_duration(duration):
     if isinstance(duration, str):
         duration = __find_str_in_sequence(
@@ -170,6 +411,24 @@ def __find_metric_id(descriptors, realm, metric):
     )
 
 
+def __find_metric_ids(descriptors, realm, metric):
+    if isinstance(metric, str):
+        return __find_metric_id(descriptors, realm, metric)
+    try:
+        results = []
+        for value in metric:
+            metric_id = __find_metric_id(descriptors, realm, value)
+            if metric_id not in results:
+                results.append(metric_id)
+    except TypeError:
+        raise TypeError(
+            '`metric` must be a string or a sequence of strings.',
+        ) from None
+    if not results:
+        raise ValueError('`metric` must contain at least one metric.')
+    return tuple(results)
+
+
 def __validate_filters(data_warehouse, descriptors, realm, filters):
     try:
         result = {}
@@ -179,12 +438,11 @@ def __validate_filters(data_warehouse, descriptors, realm, filters):
             if isinstance(filter_values, str):
                 filter_values = [filter_values]
             result[dimension_id] = []
-            valid_filter_values = data_warehouse.get_filter_values(
-                realm,
-                dimension,
+            valid_filter_values = __get_ids_by_value(
+                data_warehouse.get_filter_values(realm, dimension),
             )
             for filter_value in filter_values:
-                new_filter_value = __find_value_in_df(
+                new_filter_value = __find_value_in_ids_by_value(
                     'Filter value',
                     valid_filter_values,
                     filter_value,
@@ -198,10 +456,6 @@ def __validate_filters(data_warehouse, descriptors, realm, filters):
         ) from None
 
 
-def __assert_bool(name, value):
-    return __assert_type(name, value, bool, 'Boolean')
-
-
 def __find_str_in_sequence(value, sequence, label):
     _assert_str(label, value)
     transformed_value = __lowercase_and_remove_spaces(value)
@@ -218,9 +472,15 @@ def __find_str_in_sequence(value, sequence, label):
 def __validate_raw_fields(data_warehouse, realm, fields):
     try:
         results = []
-        valid_raw_fields = data_warehouse.describe_raw_fields(realm)
+        valid_raw_fields = __get_ids_by_value(
+            data_warehouse.describe_raw_fields(realm),
+        )
         for field in fields:
-            new_field = __find_value_in_df('Field', valid_raw_fields, field)
+            new_field = __find_value_in_ids_by_value(
+                'Field',
+                valid_raw_fields,
+                field,
+            )
             results.append(new_field)
         return results
     except TypeError:
@@ -315,13 +575,21 @@ def __get_dates_from_duration(duration):
     return durations_to_dates[duration]
 
 
-def __find_value_in_df(label, df, value):
-    if value in df.index:
-        return value
-    elif value in df['label'].values:
-        return df.index[df['label'] == value].tolist()[0]
-    else:
-        raise KeyError(label + " '" + value + "' not found.")
+def __get_ids_by_value(df):
+    # Map each ID to itself and each label to the first ID with that label,
+    # with IDs taking precedence, so that each of many values can be found
+    # without searching the whole data frame.
+    result = {}
+    for (id_, label) in zip(df.index, df['label']):
+        result.setdefault(label, id_)
+    result.update(zip(df.index, df.index))
+    return result
+
+
+def __find_value_in_ids_by_value(label, ids_by_value, value):
+    if value in ids_by_value:
+        return ids_by_value[value]
+    raise KeyError(label + " '" + value + "' not found.")
 
 
 def __lowercase_and_remove_spaces(value):
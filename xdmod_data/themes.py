@@ -1,3 +1,5 @@
+import numpy as np
+import pandas as pd
 import plotly.graph_objects as go
 import plotly.io as pio
 
@@ -125,3 +127,163 @@ pio.templates['timeseries'] = go.layout.Template(
         },
     },
 )
+
+
+def plot_timeseries(
+    data,
+    title=None,
+    max_columns=None,
+    max_points=2000,
+    downsample='lttb',
+    webgl_threshold=10000,
+):
+    """Plot a timeseries data frame returned by `DataWarehouse.get_data()`
+       using the 'timeseries' template, in a way that stays interactive for
+       large amounts of data.
+
+       Parameters
+       ----------
+       data : pandas.core.frame.DataFrame or pandas.core.series.Series
+           The data to plot, indexed by time, with one line per column.
+       title : str, optional
+           The title of the figure.
+       max_columns : int, optional
+           If not None and `data` has more columns than this, only plot the
+           `max_columns` - 1 columns with the largest sums, and plot the sum of
+           the remaining columns as a line labeled 'Other'.
+       max_points : int, optional
+           The maximum number of points to plot per line when `downsample` is
+           not None.
+       downsample : str, optional
+           How to reduce lines with more than `max_points` points: 'lttb' for
+           the Largest-Triangle-Three-Buckets algorithm, which preserves the
+           visual shape of the line, 'minmax' for keeping the minimum and
+           maximum of each of `max_points` / 2 buckets, which preserves peaks,
+           or None for not reducing lines.
+       webgl_threshold : int, optional
+           If the total number of points plotted is greater than this, render
+           the lines with WebGL instead of SVG.
+
+       Returns
+       -------
+       plotly.graph_objects.Figure
+
+       Raises
+       ------
+       KeyError
+           If `downsample` is not 'lttb', 'minmax', or None.
+       TypeError
+           If `data` is not a data frame or series.
+       ValueError
+           If `max_columns` or `max_points` is less than 2.
+    """
+    data = __validate_plot_timeseries_params(
+        data,
+        max_columns,
+        max_points,
+        downsample,
+    )
+    if max_columns is not None and len(data.columns) > max_columns:
+        data = __collapse_columns(data, max_columns)
+    lines = []
+    for column in data.columns:
+        x = data.index.to_numpy()
+        y = data[column].to_numpy(dtype=float, na_value=np.nan)
+        if downsample is not None and len(x) > max_points:
+            not_na = ~np.isnan(y)
+            indices = __DOWNSAMPLERS[downsample](y[not_na], max_points)
+            (x, y) = (x[not_na][indices], y[not_na][indices])
+        lines.append((str(column), x, y))
+    scatter = (
+        go.Scattergl
+        if sum(len(x) for (_, x, _) in lines) > webgl_threshold
+        else go.Scatter
+    )
+    figure = go.Figure(
+        data=[
+            scatter(x=x, y=y, name=name, mode='lines')
+            for (name, x, y) in lines
+        ],
+    )
+    figure.update_layout(
+        template='timeseries',
+        title=title,
+        legend_title_text=data.columns.name,
+    )
+    return figure
+
+
+def __validate_plot_timeseries_params(
+    data,
+    max_columns,
+    max_points,
+    downsample,
+):
+    if isinstance(data, pd.Series):
+        data = data.to_frame()
+    if not isinstance(data, pd.DataFrame):
+        raise TypeError('`data` must be a data frame or series.')
+    if downsample not in (None, 'lttb', 'minmax'):
+        raise KeyError(
+            'Invalid value for `downsample`: ' + repr(downsample)
+            + ". Valid values are: 'lttb', 'minmax', None.",
+        )
+    for (name, value) in (
+        ('max_columns', max_columns),
+        ('max_points', max_points),
+    ):
+        if value is not None and value < 2:
+            raise ValueError('`' + name + '` must be at least 2.')
+    return data
+
+
+def __collapse_columns(data, max_columns):
+    totals = data.sum().sort_values(ascending=False, kind='stable')
+    kept = list(totals.index[:max_columns - 1])
+    result = data[kept].copy()
+    result['Other'] = data.drop(columns=kept).sum(axis='columns', min_count=1)
+    result.columns.name = data.columns.name
+    return result
+
+
+def __lttb(y, max_points):
+    # Largest-Triangle-Three-Buckets: keep the first and last points, and
+    # from each bucket in between, the point forming the largest triangle
+    # with the point kept from the previous bucket and the average of the
+    # next bucket. Points are treated as evenly spaced.
+    if len(y) <= max_points:
+        return np.arange(len(y))
+    edges = np.linspace(1, len(y) - 1, max_points - 1).astype(int)
+    indices = np.empty(max_points, dtype=int)
+    indices[0] = 0
+    indices[-1] = len(y) - 1
+    for bucket in range(max_points - 2):
+        (start, end) = (edges[bucket], edges[bucket + 1])
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else len(y)
+        next_x = (end + next_end - 1) / 2
+        next_y = y[end:next_end].mean()
+        (previous_x, previous_y) = (indices[bucket], y[indices[bucket]])
+        x = np.arange(start, end)
+        areas = np.abs(
+            (previous_x - next_x) * (y[start:end] - previous_y)
+            - (previous_x - x) * (next_y - previous_y),
+        )
+        indices[bucket + 1] = start + np.argmax(areas)
+    return indices
+
+
+def __minmax(y, max_points):
+    if len(y) <= max_points:
+        return np.arange(len(y))
+    edges = np.linspace(0, len(y), max_points // 2 + 1).astype(int)
+    indices = set()
+    for (start, end) in zip(edges[:-1], edges[1:]):
+        indices.add(start + np.argmin(y[start:end]))
+        indices.add(start + np.argmax(y[start:end]))
+    return np.array(sorted(indices), dtype=int)
+
+
+__DOWNSAMPLERS = {
+    'lttb': __lttb,
+    'minmax': __minmax,
+}
@@ -0,0 +1,438 @@
+import abc
+import inspect
+import queue
+import requests
+import threading
+import time
+import xdmod_data._cassette as _cassette
+import zlib
+
+
+class Transport(abc.ABC):
+    """Base class for the ways in which a `DataWarehouse` sends HTTP
+       requests to the XDMoD server.
+
+       A subclass can be passed as the `transport` of a `DataWarehouse`,
+       e.g., to send requests through an in-process fake server in tests.
+       Subclasses must implement `request()`. Their methods are called
+       concurrently from multiple threads.
+    """
+
+    @abc.abstractmethod
+    def request(
+        self,
+        method,
+        url,
+        headers,
+        data=None,
+        stream=False,
+        timeout=None,
+    ):
+        """Send an HTTP request and return its response.
+
+           Redirects are followed.
+
+           Parameters
+           ----------
+           method : str
+               The HTTP method: 'GET', 'POST', or 'HEAD'.
+           url : str
+               The URL, including its query string.
+           headers : dict
+               The headers of the request.
+           data : dict, optional
+               The fields of a form-encoded POST request.
+           stream : bool, optional
+               If true, the body of the response is read by calling its
+               `iter_content()` method rather than by accessing its `text`.
+           timeout : tuple of float, optional
+               The number of seconds to wait for a connection to be made and
+               for each read from it, as a tuple `(connect, read)`. If None,
+               wait indefinitely. Subclasses whose `request()` does not have
+               this parameter are still supported, but are not passed the
+               timeouts or the time left before the `deadline` of a call.
+
+           Returns
+           -------
+           object
+               The response, which has a `status_code` attribute, a `text`
+               attribute, an `iter_content(chunk_size)` method that yields
+               the body as bytes, and a `close()` method.
+        """
+
+    def close(self):
+        """Release the connections of this transport.
+
+           The transport can still be used afterwards, in which case new
+           connections are made.
+        """
+        pass
+
+
+class RequestsTransport(Transport):
+    """Send HTTP/1.1 requests with the `requests` package.
+
+       Each thread uses a session, and with it a connection, that no other
+       thread is using at the same time; sessions are reused once their
+       responses have been read.
+    """
+
+    def __init__(self):
+        self.__idle_sessions = queue.LifoQueue()
+        self.__sessions = []
+        self.__sessions_lock = threading.Lock()
+
+    def request(
+        self,
+        method,
+        url,
+        headers,
+        data=None,
+        stream=False,
+        timeout=None,
+    ):
+        idle_sessions = self.__idle_sessions
+        session = self.__check_out_session()
+        try:
+            response = session.request(
+                method,
+                url,
+                headers=headers,
+                data=data,
+                stream=stream,
+                allow_redirects=True,
+                timeout=timeout,
+            )
+        except BaseException:
+            idle_sessions.put(session)
+            raise
+        if stream:
+            return _StreamedResponse(
+                response,
+                lambda: idle_sessions.put(session),
+            )
+        idle_sessions.put(session)
+        return response
+
+    def close(self):
+        with self.__sessions_lock:
+            for session in self.__sessions:
+                session.close()
+            self.__sessions = []
+            self.__idle_sessions = queue.LifoQueue()
+
+    def __check_out_session(self):
+        try:
+            return self.__idle_sessions.get_nowait()
+        except queue.Empty:
+            session = requests.Session()
+            with self.__sessions_lock:
+                self.__sessions.append(session)
+            return session
+
+
+class Http2Transport(Transport):
+    """Send HTTP/2 requests with the `httpx` package.
+
+       All threads share a single connection to the XDMoD server, over which
+       concurrent requests are multiplexed. Servers that do not support
+       HTTP/2 are sent HTTP/1.1 requests instead.
+
+       Raises
+       ------
+       ImportError
+           If the `httpx` package, with its `http2` extra, is not installed.
+    """
+
+    def __init__(self):
+        self.__httpx = _import_httpx()
+        self.__client = None
+        self.__client_lock = threading.Lock()
+
+    def request(
+        self,
+        method,
+        url,
+        headers,
+        data=None,
+        stream=False,
+        timeout=None,
+    ):
+        client = self.__get_client()
+        request = client.build_request(
+            method,
+            url,
+            headers=headers,
+            data=data,
+            timeout=None if timeout is None else self.__httpx.Timeout(
+                timeout[1],
+                connect=timeout[0],
+            ),
+        )
+        return _HttpxResponse(client.send(request, stream=stream))
+
+    def close(self):
+        with self.__client_lock:
+            if self.__client is not None:
+                self.__client.close()
+                self.__client = None
+
+    def __get_client(self):
+        with self.__client_lock:
+            if self.__client is None:
+                self.__client = self.__httpx.Client(
+                    http2=True,
+                    follow_redirects=True,
+                    timeout=None,
+                )
+            return self.__client
+
+
+class RecordingTransport(Transport):
+    """Send requests with another transport and record their responses.
+
+       Each request and its response, including streamed raw data, is saved
+       to a cassette file that a `ReplayTransport` can later serve without a
+       connection to the XDMoD server. The API token is not saved.
+
+       Parameters
+       ----------
+       cassette_path : str or path-like
+           The path of the cassette file. An existing file is replaced.
+       transport : str or Transport, optional
+           The transport with which requests are sent, as for the
+           `transport` of a `DataWarehouse`.
+    """
+
+    def __init__(self, cassette_path, transport='requests'):
+        self.__cassette = _cassette._Cassette(cassette_path, 'w')
+        self.__transport = _get_transport(transport)
+
+    def request(
+        self,
+        method,
+        url,
+        headers,
+        data=None,
+        stream=False,
+        timeout=None,
+    ):
+        key = _cassette._get_key(method, url, data)
+        start_time = time.monotonic()
+        response = self.__transport.request(
+            method,
+            url,
+            headers,
+            data=data,
+            stream=stream,
+            timeout=timeout,
+        )
+        latency = time.monotonic() - start_time
+        if stream:
+            return _RecordingResponse(
+                response,
+                lambda body, duration: self.__cassette._append(
+                    key,
+                    response.status_code,
+                    body,
+                    latency,
+                    duration,
+                ),
+            )
+        self.__cassette._append(
+            key,
+            response.status_code,
+            response.text.encode('utf-8'),
+            latency,
+            0,
+        )
+        return response
+
+    def close(self):
+        self.__transport.close()
+
+
+class ReplayTransport(Transport):
+    """Serve the responses recorded by a `RecordingTransport`.
+
+       Responses to repeated requests are served in the order in which they
+       were recorded; once they run out, the last one is served again.
+
+       Parameters
+       ----------
+       cassette_path : str or path-like
+           The path of the cassette file.
+       latency : bool, optional
+           If true, wait as long as the XDMoD server took to send each
+           response when it was recorded; otherwise, serve the responses as
+           fast as possible.
+
+       Raises
+       ------
+       FileNotFoundError
+           If the cassette file does not exist.
+    """
+
+    def __init__(self, cassette_path, latency=False):
+        self.__records = _cassette._Cassette(cassette_path, 'r')._load()
+        self.__num_served = {}
+        self.__lock = threading.Lock()
+        self.__latency = latency
+
+    def request(
+        self,
+        method,
+        url,
+        headers,
+        data=None,
+        stream=False,
+        timeout=None,
+    ):
+        """Serve the recorded response to a request.
+
+           Raises
+           ------
+           KeyError
+               If no response to the request was recorded.
+        """
+        key = _cassette._get_key(method, url, data)
+        if key not in self.__records:
+            raise KeyError(
+                "Request '" + key + "' not found in the cassette.",
+            )
+        with self.__lock:
+            index = self.__num_served.get(key, 0)
+            self.__num_served[key] = index + 1
+        records = self.__records[key]
+        record = records[min(index, len(records) - 1)]
+        if self.__latency:
+            time.sleep(record['latency'])
+        return _ReplayedResponse(record, self.__latency)
+
+
+class _StreamedResponse:
+    # A streamed response of the `requests` package that calls `on_close`
+    # once it has been closed, so that its session can be reused.
+    def __init__(self, response, on_close):
+        self.__response = response
+        self.__on_close = on_close
+        self.status_code = response.status_code
+
+    @property
+    def text(self):
+        return self.__response.text
+
+    def iter_content(self, chunk_size):
+        return self.__response.iter_content(chunk_size=chunk_size)
+
+    def close(self):
+        try:
+            self.__response.close()
+        finally:
+            self.__on_close()
+
+
+class _HttpxResponse:
+    # Gives an `httpx` response the interface of a `requests` response.
+    def __init__(self, response):
+        self.__response = response
+        self.status_code = response.status_code
+
+    @property
+    def text(self):
+        self.__response.read()
+        return self.__response.text
+
+    def iter_content(self, chunk_size):
+        return self.__response.iter_bytes(chunk_size=chunk_size)
+
+    def close(self):
+        self.__response.close()
+
+
+class _RecordingResponse:
+    # A streamed response whose body is passed to `on_close`, together with
+    # the number of seconds taken to read it, once it has been closed.
+    def __init__(self, response, on_close):
+        self.__response = response
+        self.__on_close = on_close
+        self.__chunks = []
+        self.__start_time = time.monotonic()
+        self.status_code = response.status_code
+
+    @property
+    def text(self):
+        text = self.__response.text
+        self.__chunks = [text.encode('utf-8')]
+        return text
+
+    def iter_content(self, chunk_size):
+        for chunk in self.__response.iter_content(chunk_size):
+            self.__chunks.append(chunk)
+            yield chunk
+
+    def close(self):
+        try:
+            self.__response.close()
+        finally:
+            self.__on_close(
+                b''.join(self.__chunks),
+                time.monotonic() - self.__start_time,
+            )
+
+
+class _ReplayedResponse:
+    # With latency, the body of a response is produced at the rate at which
+    # it was recorded.
+    def __init__(self, record, latency):
+        self.__body = zlib.decompress(record['body'])
+        self.__duration = record['duration'] if latency else 0
+        self.status_code = record['status_code']
+
+    @property
+    def text(self):
+        time.sleep(self.__duration)
+        return self.__body.decode('utf-8')
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.__body), chunk_size):
+            chunk = self.__body[start:start + chunk_size]
+            time.sleep(self.__duration * len(chunk) / len(self.__body))
+            yield chunk
+
+    def close(self):
+        pass
+
+
+def _get_transport(transport):
+    if transport == 'requests':
+        return RequestsTransport()
+    elif transport == 'http2':
+        return Http2Transport()
+    return transport
+
+
+def _accepts_timeout(transport):
+    # Transports written before the `timeout` parameter was added are called
+    # without it.
+    try:
+        parameters = inspect.signature(transport.request).parameters.values()
+    except (TypeError, ValueError):  # pragma: no cover
+        return False
+    return any(
+        parameter.name == 'timeout'
+        or parameter.kind == inspect.Parameter.VAR_KEYWORD
+        for parameter in parameters
+    )
+
+
+def _import_httpx():
+    try:
+        import h2  # noqa: F401
+        import httpx
+    except ImportError:
+        raise ImportError(
+            'The `httpx` package, with its `http2` extra, is required to use'
+            + " `transport='http2'`.",
+        ) from None
+    return httpx
@@ -1,8 +1,13 @@
 import numpy as np
 import pandas as pd
+import threading
+import xdmod_data._deadline as _deadline
 from xdmod_data._descriptors import _Descriptors
 from xdmod_data._http_requester import _HttpRequester
+from xdmod_data._raw_data_store import _RawDataStore
+from xdmod_data._response_cache import _SqliteResponseCache
 import xdmod_data._response_processor as _response_processor
+from xdmod_data._timeseries_cache import _TimeseriesCache
 import xdmod_data._validator as _validator
 
 
@@ -15,33 +20,195 @@ class DataWarehouse:
        >>> with DataWarehouse('https://xdmod.access-ci.org') as dw:
        ...     dw.get_data()
 
+       Within the runtime context, the methods of a single instance can be
+       called concurrently from multiple threads, e.g., by a
+       ``concurrent.futures.ThreadPoolExecutor``. The number of requests in
+       flight to the XDMoD server is reduced while it responds slowly or
+       with errors such as 429 or 503, and after 5 consecutive such errors,
+       requests fail immediately for 30 seconds to let it recover.
+
        Parameters
        ----------
        xdmod_host : str
            The URL of the XDMoD server.
+       cache_timeseries : bool, optional
+           If true, keep the results of timeseries calls to `get_data()` with
+           an `aggregation_unit` other than 'Auto' in memory for the lifetime
+           of this object, and only request the time periods that are not
+           already cached or whose data may still be changing on the server.
+       cache_path : str or path-like, optional
+           The path of an SQLite database file in which to cache responses
+           from the XDMoD server, e.g., for `get_data()` and
+           `get_filter_values()`. The file is created when entering the
+           runtime context if it does not exist, and can be shared by any
+           number of processes of the same user on the same host. Cached
+           responses can only be used by callers with the same API token. If
+           the file cannot be opened, belongs to another user, or can be
+           accessed by users other than its owner, a warning is issued and
+           responses are not cached. If None, responses are not cached.
+       cache_size_limit : int, optional
+           The maximum number of bytes of compressed responses to keep in the
+           cache at `cache_path`; the least recently used responses are
+           evicted first.
+       cache_max_age : int or float, optional
+           The number of seconds for which a response in the cache at
+           `cache_path` can be used.
+       check_connection : bool, optional
+           If true, check that the XDMoD server can be reached when entering
+           the runtime context, using a request for only the headers of its
+           root page. If false, an unreachable server is only reported by the
+           first method that makes a request.
+       warm_up : bool, optional
+           If true, request the descriptions of the realms, metrics,
+           dimensions, and raw data fields in the background when entering the
+           runtime context, so that they are ready, or already in progress,
+           for the first method that needs them.
+       raw_data_store_dir : str or path-like, optional
+           The path of a directory in which to save the results of calls to
+           `get_raw_data()` without `filters`, so that they can be queried
+           locally with `aggregate_raw_data()`. The directory is created if it
+           does not exist. Requires the `pyarrow` package. If None, results
+           are not saved.
+       transport : str or Transport, optional
+           How HTTP requests are sent to the XDMoD server: 'requests' sends
+           HTTP/1.1 requests over a pool of connections; 'http2' multiplexes
+           concurrent requests over a single HTTP/2 connection, which requires
+           the `httpx` package with its `http2` extra; an instance of a
+           subclass of `xdmod_data.transport.Transport` sends them however it
+           implements.
+       max_filter_values : int, optional
+           The maximum number of values of a filter to send in one request.
+           A longer list of values for a filter is split into several
+           requests that are made concurrently and whose results are
+           combined: for `get_raw_data()`, for any filter; for `get_data()`,
+           only for a filter on the given `dimension`, since only then are
+           the results of the requests disjoint.
+       resample_timeseries : bool, optional
+           If true, compute the results of timeseries calls to `get_data()`
+           with an `aggregation_unit` of 'Month', 'Quarter', or 'Year' from
+           the cached results for 'Day', requesting only the days that are
+           not already cached, for metrics whose values can be summed over
+           time, such as 'CPU Hours: Total' and 'Number of Jobs Ended' in the
+           'Jobs' realm. The results for other metrics, such as averages, are
+           requested from the server. Requires `cache_timeseries`.
+       timeout : int, float, or tuple of int or float, optional
+           The number of seconds to wait for a connection to the XDMoD server
+           to be made and for each read from it, either as a tuple (or list)
+           `(connect, read)` or as a single number for both. If a request
+           times out, the error of the transport is raised, e.g.,
+           `requests.exceptions.Timeout`. If None, wait indefinitely.
+       hedge_requests : bool, optional
+           If true, send a duplicate of a request for descriptions, filter
+           values, or aggregate `get_data()` results once it has taken
+           longer than 95% of recent requests of the same kind, and use
+           whichever response arrives first. This makes the slowest of these
+           small requests faster at the cost of about 5% more of them.
+           Timeseries and raw data requests are never duplicated.
 
        Raises
        ------
+       ImportError
+           If `transport` is 'http2' and the `httpx` package, with its `http2`
+           extra, is not installed, or if `raw_data_store_dir` is given and
+           the `pyarrow` package is not installed.
        KeyError
-           If the `XDMOD_API_TOKEN` environment variable has not been set.
+           If the `XDMOD_API_TOKEN` environment variable has not been set, or
+           if `transport` is an invalid string.
        RuntimeError
            If a connection cannot be made to the XDMoD server specified by
            `xdmod_host`.
        TypeError
-           If `xdmod_host` is not a string.
+           If `xdmod_host` is not a string, `cache_timeseries`,
+           `check_connection`, `warm_up`, `resample_timeseries`, or
+           `hedge_requests` is not a Boolean, `cache_path` or
+           `raw_data_store_dir` is not a string or path-like object,
+           `cache_size_limit` is not an integer, `cache_max_age` is not a
+           number, `transport` is not a string or `Transport`,
+           `max_filter_values` is not an integer, or `timeout` is not a
+           number or a tuple of numbers.
+       ValueError
+           If `cache_size_limit`, `cache_max_age`, `max_filter_values`, or
+           `timeout` is not positive, if `timeout` is a tuple but not of
+           length 2, or if `resample_timeseries` is true but
+           `cache_timeseries` is not.
     """
 
-    def __init__(self, xdmod_host):
+    def __init__(
+        self,
+        xdmod_host,
+        cache_timeseries=False,
+        cache_path=None,
+        cache_size_limit=2 ** 30,
+        cache_max_age=3600,
+        check_connection=True,
+        warm_up=False,
+        raw_data_store_dir=None,
+        transport='requests',
+        max_filter_values=500,
+        resample_timeseries=False,
+        timeout=(10, 300),
+        hedge_requests=False,
+    ):
         self.__in_runtime_context = False
-        self.__http_requester = _HttpRequester(xdmod_host)
+        response_cache = None
+        if cache_path is not None:
+            response_cache = _SqliteResponseCache(
+                *_validator._validate_cache_params(
+                    cache_path,
+                    cache_size_limit,
+                    cache_max_age,
+                ),
+            )
+        self.__http_requester = _HttpRequester(
+            xdmod_host,
+            response_cache,
+            _validator._validate_transport(transport),
+            _validator._validate_max_filter_values(max_filter_values),
+            _validator._validate_timeout(timeout),
+            _validator._assert_bool('hedge_requests', hedge_requests),
+        )
         self.__descriptors = _Descriptors(self.__http_requester)
+        self.__timeseries_cache = (
+            _TimeseriesCache()
+            if _validator._assert_bool('cache_timeseries', cache_timeseries)
+            else None
+        )
+        self.__resample_timeseries = _validator._validate_resample_timeseries(
+            resample_timeseries,
+            cache_timeseries,
+        )
+        self.__check_connection = _validator._assert_bool(
+            'check_connection',
+            check_connection,
+        )
+        self.__warm_up = _validator._assert_bool('warm_up', warm_up)
+        self.__warm_up_thread = None
+        raw_data_store_dir = _validator._validate_raw_data_store_dir(
+            raw_data_store_dir,
+        )
+        self.__raw_data_store = (
+            None
+            if raw_data_store_dir is None
+            else _RawDataStore(raw_data_store_dir)
+        )
 
     def __enter__(self):
         self.__in_runtime_context = True
-        self.__http_requester._start_up()
+        self.__http_requester._start_up(self.__check_connection)
+        if self.__warm_up:
+            self.__warm_up_thread = threading.Thread(
+                target=self.__load_descriptors,
+                daemon=True,
+            )
+            self.__warm_up_thread.start()
         return self
 
     def __exit__(self, type_, value, traceback):
+        # The warm-up requests are finished before the connections they use
+        # are closed.
+        if self.__warm_up_thread is not None:
+            self.__warm_up_thread.join()
+            self.__warm_up_thread = None
         self.__http_requester._tear_down()
         self.__in_runtime_context = False
 
@@ -54,6 +221,11 @@ class DataWarehouse:
         filters={},
         dataset_type='timeseries',
         aggregation_unit='Auto',
+        top_n=None,
+        include_other=False,
+        output_format='dense',
+        backend='pandas',
+        deadline=None,
     ):
         """Get a data frame or series containing data from the warehouse.
 
@@ -79,6 +251,45 @@ class DataWarehouse:
            `dimension`, and the index contains the labels of each of the values
            of the given `dimension`.
 
+           If `metric` is a sequence, the data for each of the metrics are
+           requested concurrently and combined. If `dataset_type` is
+           'timeseries', a single DataFrame is returned whose columns are
+           grouped by metric and share one DatetimeIndex: if `dimension` is
+           'None', the columns are an index named 'Metric' containing the label
+           of each metric; otherwise, the columns are a MultiIndex whose levels
+           are named 'Metric' and the label of the given `dimension`. If
+           `dataset_type` is 'aggregate' and `dimension` is 'None', a Series is
+           returned whose index contains the label of each metric; otherwise,
+           a DataFrame is returned whose index is the same as that of the
+           Series described above and whose columns are an index named
+           'Metric' containing the label of each metric.
+
+           If `top_n` is given, only the data for the `top_n` values of
+           `dimension` with the largest aggregate values of `metric` over
+           `duration` are returned, in descending order of those values. For
+           timeseries, the values are first ranked by an aggregate request,
+           and the timeseries are then requested for only those values. If
+           `include_other` is true, a column (or, for aggregates, an index
+           value) labeled 'Other' is added containing the total of all the
+           other values of `dimension`, which is only meaningful for metrics
+           that can be summed, such as 'CPU Hours: Total'.
+
+           If `dataset_type` is 'timeseries' and `output_format` is 'sparse',
+           the DataFrame described above is returned with columns of the
+           dtype 'Sparse[float64, nan]', which only store the values that are
+           not missing. If `output_format` is 'long', a DataFrame is returned
+           with one row for each value that is not missing and a RangeIndex.
+           Its columns are 'Time'; 'Metric', if `metric` is a sequence; the
+           label of `dimension`, if it is not 'None'; and either 'Value', if
+           `metric` is a sequence, or the label of `metric`. The 'Metric' and
+           dimension columns are categorical.
+
+           If `backend` is 'arrow' or 'polars', the data described above are
+           returned as a `pyarrow.Table` or a `polars.DataFrame` instead,
+           whose first columns are the index described above, if it is named,
+           and whose other columns are those described above, with the levels
+           of a MultiIndex joined by ' / '.
+
            Parameters
            ----------
            duration : str or object of length 2 of str, optional
@@ -89,9 +300,10 @@ class DataWarehouse:
            realm : str, optional
                A realm in the data warehouse. Can be specified by its ID or its
                label. See `describe_realms()`.
-           metric : str, optional
-               A metric in the given realm of the data warehouse. Can be
-               specified by its ID or its label. See `describe_metrics()`.
+           metric : str or sequence of str, optional
+               A metric in the given realm of the data warehouse, or a sequence
+               of such metrics. Can be specified by ID or label. See
+               `describe_metrics()`.
            dimension : str, optional
                A dimension of the given realm in the data warehouse. Can be
                specified by its ID or its label. See `describe_dimensions()`.
@@ -104,41 +316,68 @@ class DataWarehouse:
            aggregation_unit : str, optional
                The units by which to aggregate data. Must be one of the valid
                values from `get_aggregation_units()` (case insensitive).
+           top_n : int, optional
+               If not None, the number of values of `dimension` for which to
+               return data.
+           include_other : bool, optional
+               If true and `top_n` is given, include the total of the values
+               of `dimension` not in the top `top_n` as 'Other'.
+           output_format : str, optional
+               Either 'dense', 'sparse', or 'long' (case insensitive). Only
+               applies if `dataset_type` is 'timeseries'.
+           backend : str, optional
+               Either 'pandas', 'arrow', or 'polars' (case insensitive). The
+               'arrow' backend requires the `pyarrow` package, and the
+               'polars' backend requires both the `pyarrow` and `polars`
+               packages.
+           deadline : int or float, optional
+               If not None, the number of seconds within which this method
+               must complete, including all the requests it makes to the
+               XDMoD server.
 
            Returns
            -------
            pandas.core.frame.DataFrame | pandas.core.series.Series
+               Or, depending on `backend`, a `pyarrow.Table` or a
+               `polars.DataFrame`.
 
            Raises
            ------
+           ImportError
+               If `backend` is 'arrow' or 'polars' and the packages it
+               requires are not installed.
            KeyError
                If any of the parameters have invalid values. Valid realms
                come from `describe_realms()`, valid metrics come from
                `describe_metrics()`, valid dimensions and filter keys come from
                `describe_dimensions()`, valid filter values come from
                `get_filter_values()`, valid durations come from
-               `get_durations()`, and aggregation units come from
-               `get_aggregation_units()`.
+               `get_durations()`, aggregation units come from
+               `get_aggregation_units()`, valid output formats are 'dense',
+               'sparse', and 'long', and valid backends are 'pandas',
+               'arrow', and 'polars'.
            RuntimeError
                If this method is called outside the runtime context or if
                there is an error requesting data from the warehouse.
+           TimeoutError
+               If `deadline` is exceeded.
            TypeError
                If any of the arguments are of the wrong type.
            ValueError
-               If `duration` is an object but not of length 2.
+               If `duration` is an object but not of length 2, if `metric` is
+               an empty sequence, if `top_n` or `deadline` is not positive,
+               if `top_n` is given with multiple metrics or a `dimension` of
+               'None', or if `output_format` is 'sparse' and `backend` is not
+               'pandas'.
         """
         _validator._assert_runtime_context(self.__in_runtime_context)
-        params = _validator._validate_get_data_params(
-            self,
-            self.__descriptors,
-            locals(),
-        )
-        response = self.__http_requester._request_data(params)
-        return _response_processor._process_get_data_response(
-            self,
-            params,
-            response,
-        )
+        with _deadline._start(_validator._validate_deadline(deadline)):
+            params = _validator._validate_get_data_params(
+                self,
+                self.__descriptors,
+                locals(),
+            )
+            return self._get_data(params)
 
     def get_raw_data(
         self,
@@ -147,6 +386,11 @@ class DataWarehouse:
         fields=(),
         filters={},
         show_progress=False,
+        num_processes=1,
+        memory_limit=None,
+        checkpoint_dir=None,
+        backend='pandas',
+        deadline=None,
     ):
         """Get a data frame containing raw data from the warehouse.
 
@@ -170,17 +414,58 @@ class DataWarehouse:
            show_progress : bool, optional
                If true, periodically print how many rows have been gotten so
                far.
+           num_processes : int, optional
+               The number of processes to use for decoding the data as it is
+               received. If greater than 1, chunks of the response are decoded
+               in parallel by a pool of that many processes, which can speed
+               up large requests on machines with multiple cores. Only applies
+               to XDMoD versions newer than 10.5. The processes are started
+               with the 'spawn' method, which imports the `__main__` module
+               of the program in each of them, so a script that calls this
+               method with `num_processes` greater than 1 must do so under
+               an `if __name__ == '__main__':` guard; otherwise each process
+               runs the script again and the pool fails.
+           memory_limit : int, optional
+               If not None, the approximate number of bytes of decoded data to
+               hold in memory before writing it to a temporary file. The
+               returned data frame has the same dtypes and values as without
+               a limit, and is backed by a memory map of that file where the
+               'string' dtype of pandas is backed by Arrow; otherwise, a
+               warning is issued and the data are read back into memory. This
+               requires the `pyarrow` package.
+           checkpoint_dir : str or path-like, optional
+               If not None, a directory in which to save each completed part of
+               the request (each calendar month of `duration`, or each page of
+               results for XDMoD 10.5) as it is received. If the request fails,
+               calling this method again with the same arguments resumes from
+               the parts that were already saved. The saved parts are deleted
+               once the request completes.
+           backend : str, optional
+               Either 'pandas', 'arrow', or 'polars' (case insensitive). If
+               'arrow' or 'polars', the data are returned as a
+               `pyarrow.Table` or a `polars.DataFrame` of strings, which
+               where possible is built from the same Arrow buffers into which
+               the data were decoded, without converting them to pandas. The
+               'arrow' backend requires the `pyarrow` package, and the
+               'polars' backend requires both the `pyarrow` and `polars`
+               packages.
+           deadline : int or float, optional
+               See `get_data()`.
 
            Returns
            -------
-           pandas.core.frame.DataFrame
+           pandas.core.frame.DataFrame | pyarrow.Table | polars.DataFrame
                The columns of the data frame are each of the given `fields`.
                The data in the data frame are each of the corresponding values
                for the given `fields`. Missing values are filled with the value
-               `numpy.nan`.
+               `numpy.nan`, or are null for the 'arrow' and 'polars' backends.
 
            Raises
            ------
+           ImportError
+               If `memory_limit` is not None and the `pyarrow` package is not
+               installed, or if `backend` is 'arrow' or 'polars' and the
+               packages it requires are not installed.
            KeyError
                If any of the parameters have invalid values. Valid durations
                come from `get_durations()`, valid realms come from
@@ -191,19 +476,180 @@ class DataWarehouse:
            RuntimeError
                If this method is called outside the runtime context or if
                there is an error requesting data from the warehouse.
+           TimeoutError
+               If `deadline` is exceeded.
            TypeError
                If any of the arguments are of the wrong type.
            ValueError
-               If `duration` is an object but not of length 2.
+               If `duration` is an object but not of length 2 or if
+               `num_processes`, `memory_limit`, or `deadline` is not
+               positive.
         """
         _validator._assert_runtime_context(self.__in_runtime_context)
-        params = _validator._validate_get_raw_data_params(
+        with _deadline._start(_validator._validate_deadline(deadline)):
+            params = _validator._validate_get_raw_data_params(
+                self,
+                self.__descriptors,
+                locals(),
+            )
+            builder = self.__http_requester._request_raw_data(params)
+        if params['backend'] == 'pandas':
+            data = builder._get_data_frame()
+        else:
+            data = builder._get_table()
+        if self.__raw_data_store is not None and not params['filters']:
+            self.__raw_data_store._add(
+                params,
+                data if params['backend'] == 'pandas' else data.to_pandas(),
+            )
+        return _response_processor._convert_to_backend(
+            params['backend'],
+            data,
+        )
+
+    def aggregate_raw_data(
+        self,
+        duration,
+        realm,
+        fields,
+        aggregation='sum',
+        dimensions=(),
+        filters={},
+        dataset_type='timeseries',
+        aggregation_unit='Day',
+        time_field='End Time (Timestamp)',
+    ):
+        """Aggregate raw data that was saved by `get_raw_data()` in the
+           directory given by the `raw_data_store_dir` parameter of this
+           object, without making any requests to the warehouse.
+
+           This method can also be called outside the runtime context.
+
+           Parameters
+           ----------
+           duration : str or object of length 2 of str
+               The time period over which to aggregate data. Either a string
+               value from `get_durations()` (case insensitive) or an object of
+               length two with start and end dates specified in 'YYYY-MM-DD'
+               format. Raw data for the whole time period must have been
+               saved.
+           realm : str
+               The ID of a realm whose raw data were saved. See
+               `describe_raw_realms()`.
+           fields : str or sequence of str
+               The labels of the raw data fields to aggregate. See
+               `describe_raw_fields()`.
+           aggregation : str, optional
+               The function with which to aggregate each of the `fields`:
+               'sum', 'mean', 'min', 'max', or 'count'. All but 'count' require
+               the values of the field to be numbers.
+           dimensions : str or sequence of str, optional
+               The labels of raw data fields by whose values to group the
+               results.
+           filters : mapping, optional
+               A mapping of raw data field labels to their possible values.
+               Rows will only be included whose values for each of the given
+               fields match one of the corresponding given values.
+           dataset_type : str, optional
+               Either 'timeseries' or 'aggregate'.
+           aggregation_unit : str, optional
+               The units by which to group timeseries data, i.e., 'Day',
+               'Month', 'Quarter', or 'Year' (case insensitive). 'Auto' is
+               treated as 'Day'.
+           time_field : str, optional
+               The label of the raw data field, either a Unix timestamp or a
+               date, that determines the time of each row in UTC.
+
+           Returns
+           -------
+           pandas.core.frame.DataFrame | pandas.core.series.Series
+               If `dataset_type` is 'aggregate' and no `dimensions` are given,
+               a Series indexed by `fields`. Otherwise, a DataFrame whose
+               columns are `fields` and whose index has a level named 'Time'
+               containing the start of each time period if `dataset_type` is
+               'timeseries', followed by a level for each of the
+               `dimensions`. If no `dimensions` are given, the index contains
+               every time period in `duration`, and periods without data have
+               the value `numpy.nan`.
+
+           Raises
+           ------
+           KeyError
+               If any of the parameters have invalid values or if the saved
+               raw data do not contain the given realm, fields, or all of
+               `duration`.
+           RuntimeError
+               If `raw_data_store_dir` was not given when creating this
+               object.
+           TypeError
+               If any of the arguments are of the wrong type.
+           ValueError
+               If `duration` is an object but not of length 2, `fields` is
+               empty, or `aggregation` is not 'count' and one of the `fields`
+               is not numeric.
+        """
+        if self.__raw_data_store is None:
+            raise RuntimeError(
+                '`raw_data_store_dir` must be given when creating the'
+                + ' `DataWarehouse` in order to aggregate raw data.',
+            )
+        params = _validator._validate_aggregate_raw_data_params(locals())
+        return self.__raw_data_store._aggregate(params)
+
+    def prepare(
+        self,
+        realm='Jobs',
+        metric='CPU Hours: Total',
+        dimension='None',
+        filters={},
+        top_n=None,
+        include_other=False,
+    ):
+        """Validate the parameters of a query once so that it can be executed
+           many times for different durations and aggregation units.
+
+           Parameters
+           ----------
+           realm : str, optional
+               See `get_data()`.
+           metric : str or sequence of str, optional
+               See `get_data()`.
+           dimension : str, optional
+               See `get_data()`.
+           filters : mapping, optional
+               See `get_data()`.
+           top_n : int, optional
+               See `get_data()`.
+           include_other : bool, optional
+               See `get_data()`.
+
+           Returns
+           -------
+           PreparedQuery
+               A query whose `execute()` and `execute_many()` methods get data
+               from the warehouse for the given parameters without validating
+               them again.
+
+           Raises
+           ------
+           KeyError
+               If any of the parameters have invalid values. See
+               `get_data()`.
+           RuntimeError
+               If this method is called outside the runtime context.
+           TypeError
+               If any of the arguments are of the wrong type.
+           ValueError
+               If `metric` is an empty sequence or `top_n` is invalid. See
+               `get_data()`.
+        """
+        _validator._assert_runtime_context(self.__in_runtime_context)
+        params = _validator._validate_prepare_params(
             self,
             self.__descriptors,
             locals(),
         )
-        (data, column_data) = self.__http_requester._request_raw_data(params)
-        return self.__get_data_frame(data, column_data)
+        return PreparedQuery(self, params)
 
     def describe_realms(self):
         """Get a data frame describing the valid realms in the data warehouse.
@@ -398,6 +844,137 @@ class DataWarehouse:
             'id',
         )
 
+    def _get_data(self, params):
+        _validator._assert_runtime_context(self.__in_runtime_context)
+        return _response_processor._convert_to_backend(
+            params['backend'],
+            self.__get_pandas_data({**params, 'backend': 'pandas'}),
+        )
+
+    def __get_pandas_data(self, params):
+        if params['top_n'] is not None:
+            return self.__get_top_n_data(params)
+        if (
+            self.__timeseries_cache is not None
+            and self.__timeseries_cache._applies_to(params)
+        ):
+            return self.__get_cached_timeseries_data(params)
+        if isinstance(params['metric'], str):
+            response = self.__http_requester._request_data(params)
+            return _response_processor._process_get_data_response(
+                self,
+                params,
+                response,
+            )
+        responses = self.__http_requester._request_data_concurrently(
+            [{**params, 'metric': metric} for metric in params['metric']],
+        )
+        return _response_processor._process_get_data_responses(
+            self,
+            params,
+            responses,
+        )
+
+    def __get_top_n_data(self, params):
+        top_n = params['top_n']
+        output_format = params['output_format']
+        params = {**params, 'top_n': None, 'output_format': 'dense'}
+        ranking = self._get_data({**params, 'dataset_type': 'aggregate'})
+        ranking = ranking.dropna().sort_index().sort_values(
+            ascending=False,
+            kind='stable',
+        )
+        top = ranking.iloc[:top_n]
+        if params['dataset_type'] == 'aggregate':
+            if not params['include_other']:
+                return top
+            return pd.concat([top, pd.Series(
+                data=[ranking.iloc[top_n:].sum()],
+                index=pd.Index(['Other'], dtype='string'),
+                dtype='Float64',
+            )]).rename_axis(ranking.index.name).rename(ranking.name)
+        if top.empty:
+            return self._get_data({**params, 'output_format': output_format})
+        params_list = [{
+            **params,
+            'filters': {
+                **params['filters'],
+                params['dimension']: self.__find_top_n_filter_ids(
+                    params,
+                    top,
+                ),
+            },
+        }]
+        if params['include_other']:
+            params_list.append({**params, 'dimension': 'none'})
+        results = self._get_data_concurrently(params_list)
+        return _response_processor._convert_timeseries_data_frame(
+            output_format,
+            ranking.name,
+            self.__order_top_n_data(top, results),
+        )
+
+    def __find_top_n_filter_ids(self, params, top):
+        # Only the top labels are looked up, so that the cost does not grow
+        # with the number of values of the dimension. A label shared by
+        # several values is mapped to as many of them as it has rows in the
+        # top values.
+        counts = top.index.value_counts(sort=False)
+        ids_list = self.__http_requester._map_concurrently(
+            lambda label: self.__find_filter_ids(
+                params,
+                label,
+                counts[label],
+            ),
+            list(counts.index),
+        )
+        return [id_ for ids in ids_list for id_ in ids]
+
+    def __find_filter_ids(self, params, label, count):
+        (data, is_complete) = self.__http_requester._search_filter_values(
+            params['realm'],
+            params['dimension'],
+            label,
+        )
+        ids = [str(datum['id']) for datum in data if datum['name'] == label]
+        if len(ids) < count and not is_complete:
+            # The server did not search by the label, or many labels contain
+            # it.
+            response_data = self.__http_requester._request_filter_values(
+                params['realm'],
+                params['dimension'],
+            )
+            ids = [
+                str(datum['id']) for datum in response_data
+                if datum['name'] == label
+            ]
+        return ids[:count]
+
+    def __order_top_n_data(self, top, results):
+        data = results[0]
+        columns = [value for value in top.index if value in data.columns]
+        result = data[columns]
+        if len(results) > 1:
+            total = results[1].iloc[:, 0]
+            result = result.reindex(total.index.union(result.index))
+            result.insert(
+                len(columns),
+                'Other',
+                total - result.sum(axis='columns'),
+            )
+        result.columns = pd.Index(
+            list(result.columns),
+            dtype='string',
+            name=data.columns.name,
+        )
+        return result
+
+    def _get_data_concurrently(self, params_list):
+        return self.__http_requester._map_concurrently(
+            self._get_data,
+            params_list,
+        )
+
     def _get_metric_label(self, realm, metric_id):
         d = self.__descriptors._get_aggregate()
         return d[realm]['metrics'][metric_id]['label']
@@ -408,6 +985,73 @@ class DataWarehouse:
         d = self.__descriptors._get_aggregate()
         return d[realm]['dimensions'][dimension_id]['label']
 
+    def __load_descriptors(self):
+        # Errors are ignored here, since the same requests are made again by
+        # the first method that needs them, which then raises the errors.
+        def load(function):
+            try:
+                function()
+            except Exception:
+                pass
+        self.__http_requester._map_concurrently(
+            load,
+            (
+                self.__descriptors._get_aggregate,
+                self.__descriptors._get_raw,
+                self.__http_requester._warm_up,
+            ),
+        )
+
+    def __get_cached_timeseries_data(self, params):
+        metrics = (
+            (params['metric'],) if isinstance(params['metric'], str)
+            else params['metric']
+        )
+        parsed_responses = self.__http_requester._map_concurrently(
+            lambda metric: self.__get_cached_timeseries(
+                {**params, 'metric': metric},
+            ),
+            metrics,
+        )
+        if params['output_format'] != 'dense':
+            parsed_responses = [
+                _response_processor._get_timeseries_cells(parsed_response)
+                for parsed_response in parsed_responses
+            ]
+        return _response_processor._process_timeseries_data(
+            self,
+            params,
+            parsed_responses,
+        )
+
+    def __get_cached_timeseries(self, params):
+        day_params = (
+            self.__timeseries_cache._get_day_params(params)
+            if self.__resample_timeseries
+            else None
+        )
+        if day_params is not None:
+            return self.__timeseries_cache._resample(
+                params,
+                self.__get_cached_timeseries(day_params),
+            )
+        intervals = self.__timeseries_cache._get_missing_intervals(params)
+        responses = self.__http_requester._request_data_concurrently([
+            {
+                **params,
+                'start_date': start_date.isoformat(),
+                'end_date': end_date.isoformat(),
+            }
+            for (start_date, end_date) in intervals
+        ])
+        for (interval, response) in zip(intervals, responses):
+            self.__timeseries_cache._store(
+                params,
+                interval,
+                _response_processor._read_timeseries_response(response),
+            )
+        return self.__timeseries_cache._get(params)
+
     def __get_data_frame(self, data, column_data, index=None):
         result = pd.DataFrame(
             data=data,
@@ -441,3 +1085,126 @@ class DataWarehouse:
             ('id', 'label', 'description'),
             'id',
         )
+
+
+class PreparedQuery:
+    """A query whose parameters have already been validated, created by
+       `DataWarehouse.prepare()`.
+
+       The query can only be executed within the runtime context of the
+       `DataWarehouse` that created it.
+    """
+
+    def __init__(self, data_warehouse, params):
+        self.__data_warehouse = data_warehouse
+        self.__params = params
+
+    def execute(
+        self,
+        duration='Previous month',
+        dataset_type='timeseries',
+        aggregation_unit='Auto',
+        output_format='dense',
+        backend='pandas',
+    ):
+        """Get a data frame or series containing data from the warehouse for
+           this query.
+
+           The return value is the same as that of `DataWarehouse.get_data()`
+           called with the parameters of this query. No requests are made to
+           validate the parameters.
+
+           Parameters
+           ----------
+           duration : str or object of length 2 of str, optional
+               See `DataWarehouse.get_data()`.
+           dataset_type : str, optional
+               Either 'timeseries' or 'aggregate'.
+           aggregation_unit : str, optional
+               The units by which to aggregate data. Must be one of the valid
+               values from `get_aggregation_units()` (case insensitive).
+           output_format : str, optional
+               See `DataWarehouse.get_data()`.
+           backend : str, optional
+               See `DataWarehouse.get_data()`.
+
+           Returns
+           -------
+           pandas.core.frame.DataFrame | pandas.core.series.Series
+               Or, depending on `backend`, a `pyarrow.Table` or a
+               `polars.DataFrame`.
+
+           Raises
+           ------
+           ImportError
+               If `backend` is 'arrow' or 'polars' and the packages it
+               requires are not installed.
+           KeyError
+               If `duration`, `dataset_type`, `aggregation_unit`,
+               `output_format`, or `backend` has an invalid value.
+           RuntimeError
+               If this method is called outside the runtime context of the
+               `DataWarehouse` or if there is an error requesting data from the
+               warehouse.
+           TypeError
+               If any of the arguments are of the wrong type.
+           ValueError
+               If `duration` is a tuple but not of length 2, or if
+               `output_format` is 'sparse' and `backend` is not 'pandas'.
+        """
+        return self.__data_warehouse._get_data({
+            **self.__params,
+            **_validator._validate_execute_params(locals()),
+        })
+
+    def execute_many(
+        self,
+        durations,
+        dataset_type='timeseries',
+        aggregation_unit='Auto',
+        output_format='dense',
+        backend='pandas',
+    ):
+        """Get a list of data frames or series containing data from the
+           warehouse for this query over each of the given durations,
+           requested concurrently.
+
+           Parameters
+           ----------
+           durations : sequence
+               The time periods over which to collect data, each of which is
+               a valid `duration` for `execute()`.
+           dataset_type : str, optional
+               See `execute()`.
+           aggregation_unit : str, optional
+               See `execute()`.
+           output_format : str, optional
+               See `execute()`.
+           backend : str, optional
+               See `execute()`.
+
+           Returns
+           -------
+           list
+               The results of `execute()` for each duration, in the same
+               order as `durations`.
+
+           Raises
+           ------
+           ImportError
+               See `execute()`.
+           KeyError
+               See `execute()`.
+           RuntimeError
+               See `execute()`.
+           TypeError
+               If `durations` is a string or not iterable, or if any of the
+               other arguments are of the wrong type.
+           ValueError
+               See `execute()`.
+        """
+        params_list = [
+            {**self.__params, **params}
+            for params in _validator._validate_execute_many_params(locals())
+        ]
+        return self.__data_warehouse._get_data_concurrently(params_list)